@@ -0,0 +1,419 @@
+import json
+import os
+import queue
+import signal
+import time
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .id_card import OUTPUT_DIR, IdCard
+from .ocr_processor import OCRProcessor
+from .shared_images import SharedImage, SharedImageRing
+
+DEFAULT_SHARED_MEMORY_CONFIG = {
+    # None sizes the ring from the worker count and chunksize
+    "slots": None,
+    # Room for a 2400px-wide binarized card with margin
+    "slot_mb": 4,
+    # Directory for a memory-mapped file instead of /dev/shm
+    "directory": None
+}
+
+# One OCRProcessor per worker process, built by the pool initializer
+_worker_processor = None
+_worker_config_path = None
+# The preprocessed image ring, attached by shared-memory pipeline workers
+_worker_ring = None
+
+
+def init_worker(config_path: str):
+    """Load the OCR config and spaCy model once per worker process"""
+    global _worker_processor, _worker_config_path
+    if _worker_processor is not None:
+        _worker_processor.close()
+    else:
+        # Runs when a pool worker (or the parent, for single-worker runs) exits cleanly,
+        # so cache access times held back by the processor are written
+        Finalize(None, _close_worker, exitpriority=10)
+    _worker_processor = OCRProcessor(config_path)
+    _worker_config_path = config_path
+
+
+def _init_pool_worker(config_path: str):
+    """init_worker for pool processes, which leave Ctrl+C to the parent (see init_render_worker)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker(config_path)
+
+
+def _close_worker():
+    if _worker_processor is not None:
+        _worker_processor.close()
+
+
+def _init_shared_worker(config_path: str, ring_name: str, slots: int, slot_bytes: int):
+    """_init_pool_worker, then attach the pipeline's image ring"""
+    global _worker_ring
+    _init_pool_worker(config_path)
+    _worker_ring = SharedImageRing(slots, slot_bytes, name=ring_name)
+
+
+def _process_chunk(image_paths: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    # OCR every card in the chunk, then run NER over the chunk as one nlp.pipe batch
+    results = _worker_processor.process_id_cards(image_paths, batch_size=len(image_paths))
+    return list(zip(image_paths, results))
+
+
+def _render_and_process_chunk(json_paths: List[str], save_images: bool = False) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    # Render each card in memory and OCR the array directly, skipping the PNG round-trip
+    cards = []
+    images = []
+    timings = []
+    # index -> failure result of a card whose JSON could not be loaded or rendered
+    failed = {}
+    for index, json_path in enumerate(json_paths):
+        start = time.perf_counter()
+        try:
+            with open(json_path, "r") as f:
+                data = json.load(f)
+            loaded = time.perf_counter()
+            image = IdCard.render_id_card(data)
+            if save_images:
+                image.save(os.path.join(OUTPUT_DIR, f"{data.get('user_id', 'unknown_id')}.png"))
+        except Exception as e:
+            card = {"user_id": os.path.splitext(os.path.basename(json_path))[0], "extracted_fields": {}}
+            failed[index] = (card, _worker_processor.failed_card(e))
+            continue
+        timings.append({"json_load": loaded - start, "render": time.perf_counter() - loaded})
+        cards.append(data)
+        images.append(image)
+    results = _worker_processor.process_id_cards(images, batch_size=len(images)) if images else []
+    for result, card_timings in zip(results, timings):
+        result["timings"].update(card_timings)
+    rendered = iter(zip(cards, results))
+    # Back in input order, so results still line up with json_paths
+    return [failed[index] if index in failed else next(rendered) for index in range(len(json_paths))]
+
+
+def process_encoded_chunk(encoded_images: List[bytes]) -> List[Dict[str, Any]]:
+    """OCR encoded image bytes in a worker set up by init_worker; undecodable images come back as None"""
+    images = [cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) for data in encoded_images]
+    valid = [image for image in images if image is not None]
+    results = iter(_worker_processor.process_id_cards(valid, batch_size=len(valid)) if valid else [])
+    return [next(results) if image is not None else None for image in images]
+
+
+def _preprocess_to_ring(image_path: str, slot: int) -> Dict[str, Any]:
+    # Preprocess one card into its ring slot; only the slot handle goes back to the parent
+    processor = _worker_processor
+    processor.last_timings = {}
+    handle = None
+
+    def into_slot(shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        # The last preprocessing step writes straight into the slot
+        nonlocal handle
+        handle, array = _worker_ring.allocate(slot, shape)
+        return array
+
+    try:
+        cache_key = processor.text_cache_key(image_path)
+        cached = processor.cached_text(cache_key)
+        if cached is not None:
+            # The word boxes from this lookup go along, so the OCR stage need not look again
+            return {"cached": cached, "words": processor.last_words, "cache_key": cache_key, "timings": processor.last_timings}
+        binary = processor.preprocess_image(image_path, allocate=into_slot)
+    except Exception as e:
+        # Unreadable cards become failure results instead of failing the pipeline
+        return {"failed": processor.failed_card(e)}
+    # An image too large for a slot is pickled like before rather than failing the run
+    return {"image": handle if handle is not None else binary, "cache_key": cache_key, "timings": processor.last_timings}
+
+
+def _ocr_ring_chunk(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # OCR preprocessed cards straight from the ring, then run NER over the chunk as one batch
+    processor = _worker_processor
+    cards = []
+    for item in items:
+        if "failed" in item:
+            cards.append(item["failed"])
+            continue
+        processor.last_timings = item["timings"]
+        if "cached" in item:
+            raw_text, confidence = item["cached"]
+            processor.last_words = item["words"]
+            processor.last_cache_hit = True
+        else:
+            image = item["image"]
+            if isinstance(image, SharedImage):
+                image = _worker_ring.view(image)
+            try:
+                raw_text, confidence = processor.recognize(image, item["cache_key"])
+            except Exception as e:
+                cards.append(processor.failed_card(e))
+                continue
+            finally:
+                del image
+            processor.last_cache_hit = False
+        cards.append(processor.text_card(raw_text, confidence))
+    return processor.extract_card_fields(cards, batch_size=len(cards))
+
+
+def _chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchProcessor:
+    def __init__(self, workers: int = None, config_path: str = "config.json", chunksize: int = 16, shared_memory: bool = False):
+        """Spread OCRProcessor.process_id_cards calls across a pool of worker processes
+
+        With shared_memory, the pool opened by the context manager is also attached
+        to one image ring, so process_shared() calls reuse both.
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.config_path = config_path
+        self.chunksize = max(1, chunksize)
+        self.shared_memory = shared_memory
+        self.processed = 0
+        self.elapsed = 0.0
+        # Set while used as a context manager, so repeated calls share one pool (and ring)
+        self._pool = None
+        self._ring = None
+
+    def __enter__(self):
+        initializer, initargs = _init_pool_worker, (self.config_path,)
+        if self.shared_memory:
+            self._check_shared_memory()
+            self._ring = self._new_ring()
+            initializer, initargs = _init_shared_worker, self._ring_initargs(self._ring)
+        if self.workers > 1:
+            self._pool = Pool(self.workers, initializer=initializer, initargs=initargs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._pool is not None:
+            # On an error or Ctrl+C, busy workers are stopped rather than waited for
+            if exc_type is not None:
+                self._pool.terminate()
+            else:
+                self._pool.close()
+            self._pool.join()
+            self._pool = None
+        # The ring goes after the workers attached to it
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def process(self, image_paths: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (image_path, ocr_result) pairs in the same order as image_paths"""
+        return self._run(_process_chunk, image_paths)
+
+    def process_json(self, json_paths: Iterable[str], save_images: bool = False) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Render cards from JSON in the workers and OCR them in memory, yielding (card_data, ocr_result)"""
+        return self._run(partial(_render_and_process_chunk, save_images=save_images), json_paths)
+
+    def _load_config(self) -> Dict[str, Any]:
+        if not os.path.exists(self.config_path):
+            return {}
+        with open(self.config_path, 'r') as f:
+            return json.load(f)
+
+    def shared_memory_settings(self) -> Dict[str, Any]:
+        settings = {**DEFAULT_SHARED_MEMORY_CONFIG, **self._load_config().get("shared_memory", {})}
+        # Enough slots for a full NER chunk plus one card preprocessing per worker
+        settings["slots"] = settings["slots"] or self.chunksize + 2 * self.workers
+        return settings
+
+    def shared_memory_supported(self) -> bool:
+        """Layout extraction and the OCR cascade need the whole card in one process"""
+        config = self._load_config()
+        return not config.get("layout", {}).get("enabled", False) and not config.get("cascade", {}).get("enabled", False)
+
+    def _check_shared_memory(self):
+        if not self.shared_memory_supported():
+            raise ValueError("The shared-memory pipeline does not support layout extraction or the OCR cascade; "
+                             "disable them in the config or use process()")
+
+    def _new_ring(self) -> SharedImageRing:
+        settings = self.shared_memory_settings()
+        return SharedImageRing(settings["slots"], int(settings["slot_mb"] * 1024 * 1024), directory=settings["directory"])
+
+    def _ring_initargs(self, ring: SharedImageRing) -> Tuple[Any, ...]:
+        return (self.config_path, ring.name, ring.slots, ring.slot_bytes)
+
+    def process_shared(self, image_paths: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Like process(), with preprocessing and OCR as separate pool stages joined by shared memory
+
+        Workers preprocess each card straight into a slot of a shared image ring and
+        the OCR stage reads it there, so only small handles cross process boundaries.
+        A card starts only when a slot is free, so memory is bounded by the ring size
+        however many cards are processed. Layout extraction and the OCR cascade need
+        the whole card in one process and raise ValueError here; use process().
+        """
+        self._check_shared_memory()
+        self.processed = 0
+        start = time.perf_counter()
+        try:
+            if self._ring is not None:
+                # Opened by the context manager with shared_memory=True
+                yield from self._flatten([item] for item in self._shared_items(self._pool, self._ring, image_paths))
+                return
+            with self._new_ring() as ring:
+                if self.workers == 1:
+                    yield from self._flatten([item] for item in self._shared_items(None, ring, image_paths))
+                    return
+                with Pool(self.workers, initializer=_init_shared_worker, initargs=self._ring_initargs(ring)) as pool:
+                    yield from self._flatten([item] for item in self._shared_items(pool, ring, image_paths))
+                    # Leaving the with block terminates the workers; let them exit so they close their processors
+                    pool.close()
+                    pool.join()
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _shared_items(self, pool: Optional[Pool], ring: SharedImageRing, image_paths: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if pool is None:
+            return self._shared_serial(ring, image_paths)
+        return self._shared_pipeline(pool, ring, image_paths)
+
+    def _shared_serial(self, ring: SharedImageRing, image_paths: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        global _worker_ring
+        if _worker_processor is None or _worker_config_path != self.config_path:
+            init_worker(self.config_path)
+        _worker_ring = ring
+        try:
+            for chunk in _chunked(image_paths, min(self.chunksize, ring.slots)):
+                slots = [ring.acquire() for _ in chunk]
+                try:
+                    items = [_preprocess_to_ring(image_path, slot) for image_path, slot in zip(chunk, slots)]
+                    results = _ocr_ring_chunk(items)
+                finally:
+                    for slot in slots:
+                        ring.release(slot)
+                yield from zip(chunk, results)
+        finally:
+            _worker_ring = None
+
+    def _shared_pipeline(self, pool: Pool, ring: SharedImageRing, image_paths: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Schedule preprocess and OCR tasks on one pool, yielding results in input order
+
+        Every slot is free again when this returns, raises or is closed early, so a
+        long-lived ring can be reused by the next call.
+        """
+        # Pool callbacks run on the pool's result thread; they only enqueue.
+        # Failures come back under their stage's kind with the exception as payload.
+        events = queue.Queue()
+        paths = enumerate(image_paths)
+        exhausted = False
+        preprocessing = 0
+        ocr_chunks = 0
+        # (index, slot, item) preprocessed and waiting for an OCR chunk
+        ready = []
+        # index -> (image_path, result) finished ahead of an earlier card
+        finished = {}
+        path_of = {}
+        next_index = 0
+        chunk_size = min(self.chunksize, ring.slots)
+
+        def settle(kind: str, key: Any, payload: Any):
+            # Account for one finished task and free the slots it no longer needs
+            nonlocal preprocessing, ocr_chunks
+            if kind == "preprocessed":
+                preprocessing -= 1
+                index, slot = key
+                if isinstance(payload, BaseException):
+                    ring.release(slot)
+                else:
+                    ready.append((index, slot, payload))
+            else:
+                ocr_chunks -= 1
+                for _, slot in key:
+                    ring.release(slot)
+
+        try:
+            while True:
+                # Start a card whenever a slot is free
+                while not exhausted and ring.free:
+                    entry = next(paths, None)
+                    if entry is None:
+                        exhausted = True
+                        break
+                    index, image_path = entry
+                    slot = ring.acquire()
+                    path_of[index] = image_path
+                    on_done = partial(self._event, events, "preprocessed", (index, slot))
+                    pool.apply_async(_preprocess_to_ring, (image_path, slot), callback=on_done, error_callback=on_done)
+                    preprocessing += 1
+
+                # Hand full chunks to OCR, or whatever is ready once nothing else can join it
+                if ready and (len(ready) >= chunk_size or preprocessing == 0):
+                    chunk, ready = ready[:chunk_size], ready[chunk_size:]
+                    on_done = partial(self._event, events, "recognized", [(index, slot) for index, slot, _ in chunk])
+                    pool.apply_async(_ocr_ring_chunk, ([item for _, _, item in chunk],), callback=on_done, error_callback=on_done)
+                    ocr_chunks += 1
+                    continue
+
+                if exhausted and not preprocessing and not ocr_chunks and not ready:
+                    return
+
+                kind, key, payload = events.get()
+                settle(kind, key, payload)
+                if isinstance(payload, BaseException):
+                    raise payload
+                if kind == "recognized":
+                    for (index, _), result in zip(key, payload):
+                        finished[index] = (path_of.pop(index), result)
+                    while next_index in finished:
+                        yield finished.pop(next_index)
+                        next_index += 1
+        finally:
+            # Wait out tasks still writing to or reading from slots before giving them back
+            while preprocessing or ocr_chunks:
+                settle(*events.get())
+            for _, slot, _ in ready:
+                ring.release(slot)
+
+    @staticmethod
+    def _event(events: queue.Queue, kind: str, key: Any, payload: Any):
+        events.put((kind, key, payload))
+
+    def _run(self, chunk_fn, items: Iterable[str]) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        self.processed = 0
+        start = time.perf_counter()
+        chunks = _chunked(items, self.chunksize)
+        try:
+            if self.workers == 1:
+                # Avoid the pool overhead entirely for single-worker runs
+                if _worker_processor is None or _worker_config_path != self.config_path:
+                    init_worker(self.config_path)
+                yield from self._flatten(map(chunk_fn, chunks))
+            elif self._pool is not None:
+                yield from self._flatten(self._pool.imap(chunk_fn, chunks))
+            else:
+                with Pool(self.workers, initializer=_init_pool_worker, initargs=(self.config_path,)) as pool:
+                    # imap keeps chunks in submission order
+                    yield from self._flatten(pool.imap(chunk_fn, chunks))
+                    # Leaving the with block terminates the workers; let them exit so they close their processors
+                    pool.close()
+                    pool.join()
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _flatten(self, chunk_results: Iterable[List[Tuple[str, Dict[str, Any]]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for chunk in chunk_results:
+            for item in chunk:
+                self.processed += 1
+                yield item
+
+    @property
+    def throughput(self) -> float:
+        """Cards per second over the last call to process()"""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
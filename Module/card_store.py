@@ -0,0 +1,375 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Fields with their own columns; any other field of a card goes in a per-row JSON column
+CARD_FIELDS = ("name", "college", "roll_number", "branch", "valid_upto")
+EXTRA = "extra_json"
+# Value of a text cell that was never set, distinct from "" and None
+MISSING = object()
+
+# Column layouts for validated OCR results and for ground truth alone
+RESULT_TEXT_COLUMNS = (
+    ["user_id"]
+    + [f"original_{f}" for f in CARD_FIELDS + (EXTRA,)]
+    + [f"extracted_{f}" for f in CARD_FIELDS + (EXTRA,)]
+    + [f"accuracy_{EXTRA}"]
+)
+RESULT_FLOAT_COLUMNS = ["confidence", "accuracy"] + [f"accuracy_{f}" for f in CARD_FIELDS]
+TRUTH_TEXT_COLUMNS = ["user_id"] + [f"original_{f}" for f in CARD_FIELDS + (EXTRA,)]
+
+
+def user_id_hash(user_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def field_columns(prefix: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns for one group of fields: CARD_FIELDS directly, the rest in one JSON cell"""
+    columns = {f"{prefix}_{field}": value for field, value in fields.items() if field in CARD_FIELDS}
+    extra = {field: value for field, value in fields.items() if field not in CARD_FIELDS}
+    if extra:
+        columns[f"{prefix}_{EXTRA}"] = extra
+    return columns
+
+
+def _encode(value: Any) -> bytes:
+    """Text cell bytes: a one-byte type tag ("s" string, "j" JSON) then the value; missing is empty"""
+    if value is MISSING:
+        return b""
+    if isinstance(value, str):
+        return b"s" + value.encode("utf-8")
+    return b"j" + json.dumps(value).encode("utf-8")
+
+
+def _decode(data: bytes) -> Any:
+    if not data:
+        return MISSING
+    if data[:1] == b"s":
+        return data[1:].decode("utf-8")
+    return json.loads(data[1:])
+
+
+def result_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a validate_card result into store columns; missing fields stay missing / NaN"""
+    return {
+        "user_id": result["user_id"],
+        "confidence": result["confidence"],
+        "accuracy": result["accuracy"],
+        **field_columns("original", result["original_fields"]),
+        **field_columns("extracted", result["extracted_fields"]),
+        **field_columns("accuracy", result["field_accuracy"])
+    }
+
+
+class CardStoreWriter:
+    def __init__(self, path: str, text_columns: List[str] = RESULT_TEXT_COLUMNS,
+                 float_columns: List[str] = RESULT_FLOAT_COLUMNS, append: bool = False, meta: Dict[str, Any] = None):
+        """Append rows to a columnar card store; the user_id index is updated on flush and close
+
+        Each float column is a raw float64 file and each text column a byte file
+        of type-tagged values plus int64 end offsets, so readers can memory-map
+        every column and get back exactly what was appended.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta = {"rows": 0, "text_columns": text_columns,
+                     "float_columns": float_columns, **(meta or {})}
+
+        meta_path = os.path.join(path, "meta.json")
+        if append and os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                existing = json.load(f)
+            self.meta = {**existing, **(meta or {})}
+            self._truncate(existing["rows"])
+            self._index_hash, self._index_rows = self._load_index(existing["rows"])
+            mode = "ab"
+        else:
+            mode = "wb"
+            self._discard()
+            self._index_hash = np.empty(0, dtype=np.uint64)
+            self._index_rows = np.empty(0, dtype=np.int64)
+        # Hashes appended since the last flush, merged into the sorted index by flush
+        self._pending_hashes: List[int] = []
+
+        self._files = {"user_id.hash": open(os.path.join(path, "user_id.hash"), mode)}
+        self._text_ends = {}
+        for column in self.meta["text_columns"]:
+            self._files[f"{column}.off"] = open(os.path.join(path, f"{column}.off"), mode)
+            self._files[f"{column}.bin"] = open(os.path.join(path, f"{column}.bin"), mode)
+            self._text_ends[column] = self._files[f"{column}.bin"].tell()
+        for column in self.meta["float_columns"]:
+            self._files[f"{column}.f64"] = open(os.path.join(path, f"{column}.f64"), mode)
+
+    def _discard(self):
+        """Remove a previous store before rebuilding it in place
+
+        meta.json goes first, so readers opening the store from now on fail
+        instead of trusting its row count; unlinking (rather than truncating)
+        the column files leaves readers that already mapped them unaffected.
+        """
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in os.listdir(self.path):
+            if name.endswith((".hash", ".rows", ".off", ".bin", ".f64")):
+                os.remove(os.path.join(self.path, name))
+
+    def _replace(self, name: str, write):
+        """Write a file next to its final name and rename it over, so readers never see it half written"""
+        tmp_path = os.path.join(self.path, f"{name}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def _truncate(self, rows: int):
+        """Drop anything written after the last close, e.g. by a crashed run"""
+        def cut(name: str, size: int):
+            file_path = os.path.join(self.path, name)
+            if os.path.exists(file_path) and os.path.getsize(file_path) > size:
+                os.truncate(file_path, size)
+
+        cut("user_id.hash", rows * 8)
+        for column in self.meta["float_columns"]:
+            cut(f"{column}.f64", rows * 8)
+        for column in self.meta["text_columns"]:
+            cut(f"{column}.off", rows * 8)
+            end = int(np.fromfile(os.path.join(self.path, f"{column}.off"), dtype=np.int64, count=1, offset=(rows - 1) * 8)[0]) if rows else 0
+            cut(f"{column}.bin", end)
+
+    def _load_index(self, rows: int):
+        """The sorted index of the first rows rows, as written by the last flush"""
+        hash_path = os.path.join(self.path, "index.hash")
+        rows_path = os.path.join(self.path, "index.rows")
+        if not (os.path.exists(hash_path) and os.path.exists(rows_path)):
+            hashes = np.fromfile(os.path.join(self.path, "user_id.hash"), dtype=np.uint64, count=rows)
+            order = np.argsort(hashes, kind="stable")
+            return hashes[order], order.astype(np.int64)
+        index_hash = np.fromfile(hash_path, dtype=np.uint64)
+        index_rows = np.fromfile(rows_path, dtype=np.int64)
+        # Entries for rows cut by _truncate
+        kept = index_rows < rows
+        return index_hash[kept], index_rows[kept]
+
+    def append(self, row: Dict[str, Any]):
+        key = user_id_hash(row["user_id"])
+        self._pending_hashes.append(key)
+        self._files["user_id.hash"].write(np.uint64(key).tobytes())
+        for column in self.meta["text_columns"]:
+            data = _encode(row.get(column, MISSING))
+            self._files[f"{column}.bin"].write(data)
+            self._text_ends[column] += len(data)
+            self._files[f"{column}.off"].write(np.int64(self._text_ends[column]).tobytes())
+        for column in self.meta["float_columns"]:
+            self._files[f"{column}.f64"].write(np.float64(row.get(column, np.nan)).tobytes())
+        self.meta["rows"] += 1
+
+    def flush(self):
+        """Publish the rows appended so far to readers, keeping the writer open"""
+        for f in self._files.values():
+            f.flush()
+        # Sort only the new rows and merge them into the sorted index; a stable sort and
+        # inserting after equal hashes keep duplicates in write order
+        new_hashes = np.array(self._pending_hashes, dtype=np.uint64)
+        order = np.argsort(new_hashes, kind="stable")
+        new_rows = np.arange(self.meta["rows"] - len(new_hashes), self.meta["rows"], dtype=np.int64)[order]
+        new_hashes = new_hashes[order]
+        positions = np.searchsorted(self._index_hash, new_hashes, side="right")
+        self._index_hash = np.insert(self._index_hash, positions, new_hashes)
+        self._index_rows = np.insert(self._index_rows, positions, new_rows)
+        self._pending_hashes = []
+        self._replace("index.hash", self._index_hash.tofile)
+        self._replace("index.rows", self._index_rows.tofile)
+        # meta.json goes last; until it is replaced readers see the previous state
+        def write_meta(meta_path: str):
+            with open(meta_path, 'w') as f:
+                json.dump(self.meta, f)
+        self._replace("meta.json", write_meta)
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CardStore:
+    def __init__(self, path: str):
+        """Read-only, memory-mapped view of a store written by CardStoreWriter"""
+        self.path = path
+        self.meta = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Pick up rows published since the view was opened; True if there were any"""
+        with open(os.path.join(self.path, "meta.json"), 'r') as f:
+            meta = json.load(f)
+        if meta == self.meta:
+            return False
+        self.meta = meta
+        self.rows = self.meta["rows"]
+        self._index_hash = self._map("index.hash", np.uint64)
+        self._index_rows = self._map("index.rows", np.int64)
+        # Every column is mapped up front, so a writer rebuilding the store later
+        # cannot swap files under this view
+        self._columns = {column: self._map(f"{column}.f64", np.float64) for column in self.meta["float_columns"]}
+        for column in self.meta["text_columns"]:
+            # Plain memoryview/mmap indexing: per-row numpy scalars would cost more than the lookup
+            ends = memoryview(self._mmap(f"{column}.off", self.rows * 8)).cast("q")
+            self._columns[column] = (ends, self._mmap(f"{column}.bin", ends[-1] if self.rows else 0))
+        return True
+
+    def _mmap(self, name: str, size: int):
+        """Read-only mapping of the first size bytes of a column file"""
+        if size == 0:
+            return b""
+        with open(os.path.join(self.path, name), 'rb') as f:
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _map(self, name: str, dtype) -> np.ndarray:
+        return np.frombuffer(self._mmap(name, self.rows * np.dtype(dtype).itemsize), dtype=dtype)
+
+    def floats(self, column: str) -> np.ndarray:
+        """A float column over every row, without reading it into memory"""
+        return self._columns[column]
+
+    def text(self, column: str, row: int) -> Any:
+        """The value appended to a text column, or MISSING if the row did not set it"""
+        ends, data = self._columns[column]
+        start = ends[row - 1] if row else 0
+        return _decode(data[start:ends[row]])
+
+    def row(self, user_id: str) -> Optional[int]:
+        """Row of the latest record for user_id, or None"""
+        key = np.uint64(user_id_hash(user_id))
+        lo = np.searchsorted(self._index_hash, key, side="left")
+        hi = np.searchsorted(self._index_hash, key, side="right")
+        # Walk back from the newest row in case of a 64-bit hash collision
+        for row in reversed(self._index_rows[lo:hi].tolist()):
+            if self.text("user_id", row) == user_id:
+                return row
+        return None
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.row(user_id) is not None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def latest_rows(self) -> np.ndarray:
+        """Rows holding the newest record of each user_id, for stores written in append mode"""
+        if not self.rows:
+            return self._index_rows
+        last_of_run = np.append(self._index_hash[1:] != self._index_hash[:-1], True)
+        return np.sort(self._index_rows[last_of_run])
+
+    def fields(self, row: int, prefix: str) -> Dict[str, Any]:
+        """One group of fields (original_, extracted_ or accuracy_) of a row, as stored"""
+        values = {}
+        for column in self.meta["text_columns"] + self.meta["float_columns"]:
+            if not column.startswith(prefix):
+                continue
+            field = column[len(prefix):]
+            if field == EXTRA:
+                extra = self.text(column, row)
+                if extra is not MISSING:
+                    values.update(extra)
+            elif column in self.meta["float_columns"]:
+                value = float(self.floats(column)[row])
+                if not np.isnan(value):
+                    values[field] = value
+            else:
+                value = self.text(column, row)
+                if value is not MISSING:
+                    values[field] = value
+        return values
+
+    def original_fields(self, user_id: str) -> Optional[Dict[str, str]]:
+        row = self.row(user_id)
+        return None if row is None else self.fields(row, "original_")
+
+    def result(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The latest stored result for user_id, shaped like validate_card's output"""
+        row = self.row(user_id)
+        if row is None:
+            return None
+        return {
+            "user_id": user_id,
+            "confidence": float(self.floats("confidence")[row]),
+            "accuracy": float(self.floats("accuracy")[row]),
+            "field_accuracy": self.fields(row, "accuracy_"),
+            "extracted_fields": self.fields(row, "extracted_"),
+            "original_fields": self.fields(row, "original_")
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics over the latest result of every card, from column scans"""
+        rows = self.latest_rows()
+        summary = {
+            "total_cards": len(rows),
+            "avg_confidence": float(self.floats("confidence")[rows].mean()) if len(rows) else 0.0,
+            "avg_accuracy": float(self.floats("accuracy")[rows].mean()) if len(rows) else 0.0,
+            "field_accuracy": {}
+        }
+        for column in self.meta["float_columns"]:
+            if column.startswith("accuracy_"):
+                values = self.floats(column)[rows]
+                values = values[~np.isnan(values)]
+                # A field no card had is left out, as in the per-card results
+                if len(values):
+                    summary["field_accuracy"][column[len("accuracy_"):]] = float(values.mean())
+        # Fields outside CARD_FIELDS are only in the per-row JSON column
+        extra_column = f"accuracy_{EXTRA}"
+        if extra_column in self.meta["text_columns"]:
+            extra_values: Dict[str, List[float]] = {}
+            for row in rows.tolist():
+                extra = self.text(extra_column, row)
+                if extra is not MISSING:
+                    for field, value in extra.items():
+                        extra_values.setdefault(field, []).append(value)
+            for field, values in extra_values.items():
+                summary["field_accuracy"][field] = sum(values) / len(values)
+        return summary
+
+
+def _json_signature(json_paths: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for path in json_paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def open_ground_truth(json_dir: str, path: str) -> CardStore:
+    """Ground-truth store for json_dir, rebuilt only when a JSON file is added, removed or changed"""
+    json_paths = [os.path.join(json_dir, name) for name in sorted(os.listdir(json_dir)) if name.endswith(".json")]
+    signature = _json_signature(json_paths)
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("signature") == signature and meta["text_columns"] == TRUTH_TEXT_COLUMNS:
+            return CardStore(path)
+
+    print(f"Building ground-truth store for {len(json_paths)} cards in {path}")
+    with CardStoreWriter(path, TRUTH_TEXT_COLUMNS, [], meta={"signature": signature}) as writer:
+        for json_path in json_paths:
+            try:
+                with open(json_path, 'r') as f:
+                    data = json.load(f)
+                fields = data["extracted_fields"]
+            except (ValueError, KeyError) as e:
+                # Cards from this file fail validation with "no ground truth" instead of stopping the build
+                print(f"Skipping {json_path} in the ground-truth store: {type(e).__name__}: {e}")
+                continue
+            # Keyed like the files, so a lookup matches opening <user_id>.json
+            user_id = os.path.splitext(os.path.basename(json_path))[0]
+            writer.append({"user_id": user_id, **field_columns("original", fields)})
+    return CardStore(path)
@@ -0,0 +1,106 @@
+import json
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+from .batch_processor import BatchProcessor
+from .scoring import normalize_text, precision_recall_f1, score_fields
+
+
+class CardEvaluator:
+    """Evaluate the full OCR + NER path on a held-out directory of card images with ground-truth JSON"""
+
+    def __init__(self, json_dir: str, workers: int = None, chunksize: int = 16,
+                 config_path: str = "config.json", scorer: str = "levenshtein"):
+        self.json_dir = json_dir
+        self.batch = BatchProcessor(workers=workers, config_path=config_path, chunksize=chunksize)
+        self.scorer = scorer
+        # Only aggregates are kept in memory; per-card details are streamed to disk
+        self.field_counts: Dict[str, Dict[str, float]] = {}
+        self.cards = 0
+        self.missing_truth = 0
+
+    def _truth(self, user_id: str) -> Dict[str, str]:
+        json_path = os.path.join(self.json_dir, f"{user_id}.json")
+        if not os.path.exists(json_path):
+            return None
+        with open(json_path, 'r') as f:
+            return json.load(f)["extracted_fields"]
+
+    def _results(self, image_dir: str = None, render: bool = False) -> Iterator[Tuple[str, Dict[str, str], Dict[str, Any]]]:
+        """(user_id, ground truth, ocr_result) for every card, scanned images or rendered from JSON"""
+        if render:
+            json_paths = [
+                os.path.join(self.json_dir, filename)
+                for filename in sorted(os.listdir(self.json_dir))
+                if filename.endswith(".json")
+            ]
+            for data, ocr_result in self.batch.process_json(json_paths):
+                yield data["user_id"], data["extracted_fields"], ocr_result
+            return
+
+        image_paths = [
+            os.path.join(image_dir, filename)
+            for filename in sorted(os.listdir(image_dir))
+            if filename.lower().endswith((".png", ".jpg", ".jpeg", ".tif", ".tiff"))
+        ]
+        for image_path, ocr_result in self.batch.process(image_paths):
+            user_id = os.path.splitext(os.path.basename(image_path))[0]
+            yield user_id, self._truth(user_id), ocr_result
+
+    def _count(self, truth: Dict[str, str], extracted: Dict[str, str], accuracy: Dict[str, float]):
+        """Exact-match field counts on normalized values, plus summed similarity"""
+        for field in set(truth) | set(extracted):
+            counts = self.field_counts.setdefault(field, {"tp": 0, "fp": 0, "fn": 0, "similarity": 0.0, "support": 0})
+            if field in truth:
+                counts["support"] += 1
+                counts["similarity"] += accuracy[field]
+            if field in truth and field in extracted:
+                if normalize_text(truth[field]) == normalize_text(extracted[field]):
+                    counts["tp"] += 1
+                else:
+                    # A wrong value is both a false positive and a missed field
+                    counts["fp"] += 1
+                    counts["fn"] += 1
+            elif field in truth:
+                counts["fn"] += 1
+            else:
+                counts["fp"] += 1
+
+    def evaluate(self, details_path: str, image_dir: str = None, render: bool = False) -> Dict[str, Any]:
+        """Stream per-card details to details_path (JSONL) and return aggregate metrics"""
+        with open(details_path, 'w') as details:
+            for user_id, truth, ocr_result in self._results(image_dir, render):
+                if truth is None:
+                    self.missing_truth += 1
+                    continue
+                extracted = ocr_result["extracted_fields"]
+                accuracy = score_fields(truth, extracted, self.scorer)
+                self._count(truth, extracted, accuracy)
+                self.cards += 1
+                details.write(json.dumps({
+                    "user_id": user_id,
+                    "confidence": ocr_result["confidence"],
+                    "field_accuracy": accuracy,
+                    "extracted_fields": extracted,
+                    "original_fields": truth
+                }) + "\n")
+        return self.summary(details_path)
+
+    def summary(self, details_path: str = None) -> Dict[str, Any]:
+        per_field = {
+            field: {
+                **precision_recall_f1(counts),
+                "mean_similarity": counts["similarity"] / counts["support"] if counts["support"] else 0.0,
+                "support": counts["support"]
+            }
+            for field, counts in sorted(self.field_counts.items())
+        }
+        totals = {key: sum(counts[key] for counts in self.field_counts.values()) for key in ("tp", "fp", "fn")}
+        return {
+            **precision_recall_f1(totals),
+            "cards": self.cards,
+            "missing_truth": self.missing_truth,
+            "throughput": self.batch.throughput,
+            "per_field_metrics": per_field,
+            "details_path": details_path
+        }
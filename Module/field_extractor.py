@@ -0,0 +1,92 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Container, Dict, Tuple
+
+# Used when config.json is missing or does not define a section
+DEFAULT_PATTERNS = {
+    # Field extraction from OCR text (OCRProcessor.extract_fields)
+    "field_patterns": {
+        "name": r"Name:\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        "college": r"College:\s*([A-Za-z\s.,&\-]+)",
+        "roll_number": r"Roll [Nn]umber:\s*([A-Z0-9]{6,15})",
+        "branch": r"Branch:\s*([A-Za-z\s]+)",
+        # clean_text reads 0/1/5 as O/I/S
+        "valid_upto": r"Valid upto:\s*([0-9OIS]{4})\b"
+    },
+    # Regex fallback for fields the NER model missed (NERProcessor)
+    "ner_fallback_patterns": {
+        "id_number": r"(?:ID|Number|#):\s*(?P<value>\b[A-Z0-9]{6,}\b)",
+        "date": r"(?:Date|DOB):\s*(?P<value>\d{2}[-/]\d{2}[-/]\d{4})",
+        "email": r"(?:Email|E-mail):\s*(?P<value>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)",
+        "phone": r"(?:Phone|Mobile|Tel):\s*(?P<value>(?:\+\d{1,3}[-\s]?)?\d{3}[-\s]?\d{3}[-\s]?\d{4})",
+        "name": r"(?:Name):\s*(?P<value>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        "college": r"(?:College|Institution):\s*(?P<value>[A-Za-z\s.,&\-]+)",
+        "branch": r"(?:Branch|Department):\s*(?P<value>[A-Za-z\s]+)"
+    },
+    # Whole-value validation of JSON fields before rendering (IdCard)
+    "validation_patterns": {
+        "name": r"^\s*[A-Z][a-z]+(?: [A-Z][a-z]+)*\s*$",
+        "college": r"^[A-Za-z0-9\s.,&\-]+$",
+        "roll_number": r"^[A-Z0-9]{6,15}$",
+        "branch": r"^[A-Za-z\s]+$"
+    }
+}
+
+SECTION_FLAGS = {
+    "ner_fallback_patterns": re.IGNORECASE
+}
+
+
+class FieldExtractor:
+    def __init__(self, patterns: Dict[str, str], flags: int = 0):
+        """Compile a field -> regex mapping once for repeated extraction and validation"""
+        self.patterns = {}
+        for field, pattern in patterns.items():
+            compiled = re.compile(pattern, flags)
+            # The value is the named group "value" if present, otherwise the first group
+            value_group = compiled.groupindex.get("value", 1 if compiled.groups else 0)
+            self.patterns[field] = (compiled, value_group)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], section: str) -> "FieldExtractor":
+        """Build an extractor from the extraction section of a loaded config"""
+        patterns = config.get("extraction", {}).get(section, DEFAULT_PATTERNS[section])
+        return cls(patterns, SECTION_FLAGS.get(section, 0))
+
+    def extract(self, text: str, skip: Container[str] = ()) -> Dict[str, str]:
+        """Return the first match for every field not listed in skip"""
+        return {field: value for field, (value, _) in self.extract_spans(text, skip).items()}
+
+    def extract_spans(self, text: str, skip: Container[str] = ()) -> Dict[str, Tuple[str, int]]:
+        """Like extract, with the offset of each value in text"""
+        fields = {}
+        for field, (pattern, value_group) in self.patterns.items():
+            if field in skip:
+                continue
+            match = pattern.search(text)
+            if match:
+                value = match.group(value_group)
+                stripped = value.strip()
+                fields[field] = (stripped, match.start(value_group) + len(value) - len(value.lstrip()))
+        return fields
+
+    def validate(self, field: str, value: str) -> bool:
+        """Fields without a pattern are always valid"""
+        entry = self.patterns.get(field)
+        return entry is None or entry[0].fullmatch(value) is not None
+
+
+@lru_cache(maxsize=None)
+def _load_config(config_path: str) -> Dict[str, Any]:
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+@lru_cache(maxsize=None)
+def get_extractor(section: str, config_path: str = "config.json") -> FieldExtractor:
+    """Shared extractor for a config section, loaded and compiled once per process"""
+    return FieldExtractor.from_config(_load_config(config_path), section)
@@ -1,9 +1,14 @@
 import os
+import signal
+import time
 from dotenv import load_dotenv
 import json
-import subprocess
-import re
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import NamedTuple
 from PIL import Image, ImageDraw, ImageFont
+from .field_extractor import get_extractor
+from .training_data import TrainingDataBuilder
 
 load_dotenv()
 
@@ -15,105 +20,145 @@ box_dir = os.getenv("box_dir")
 gt_dir = os.getenv("gt_dir")
 output_lstmf_dir = os.getenv("output_lstmf_dir")
 
-class IdCard:
-    @staticmethod
-    def create_id_card(json_file_path):
-        with open(json_file_path, "r") as f:
-            data = json.load(f)
-
+class CardRenderer:
+    def __init__(self, font_path=FONT_PATH, font_size=FONT_SIZE, size=(600, 300)):
+        """Load the font, validation patterns and blank card once and reuse them for every card"""
+        self.font = ImageFont.truetype(font_path, font_size)
+        self.validator = get_extractor("validation_patterns")
+        self.background = Image.new("RGB", size, color="white")
+        # Pre-drawn labels keyed by the card's field layout
+        self._templates = {}
+
+    def _template(self, keys):
+        """Background with the header and field labels drawn, plus where each value starts"""
+        template = self._templates.get(keys)
+        if template is None:
+            img = self.background.copy()
+            draw = ImageDraw.Draw(img)
+            positions = []
+            y = 20
+            for i, label in enumerate(["ID Card - "] + [f"{key.capitalize().replace('_', ' ')}: " for key in keys]):
+                draw.text((20, y), label, font=self.font, fill="black")
+                positions.append((20 + self.font.getlength(label), y))
+                y += 40 if i == 0 else 35
+            template = (img, positions)
+            self._templates[keys] = template
+        return template
+
+    def render(self, data):
         user_id = data.get("user_id", "unknown_id")
         fields = data.get("extracted_fields", {})
 
-        patterns = {
-            "name": r"^\s*[A-Z][a-z]+(?: [A-Z][a-z]+)*\s*$", 
-            "college": r"^[A-Za-z0-9\s.,&\-]+$",        
-            "roll_number": r"^[A-Z0-9]{6,15}$",          
-            "branch": r"^[A-Za-z\s]+$"                  
-        }
-
         validated_fields = {}
         for key, value in fields.items():
-            pattern = patterns.get(key)
-            if pattern and not re.fullmatch(pattern, value):
+            if not self.validator.validate(key, value):
                 print(f"Warning: Field '{key}' with value '{value}' failed validation.")
                 continue
             validated_fields[key] = value
 
-        # Create image
-        img = Image.new("RGB", (600, 300), color="white")
+        # Only the values are drawn per card; labels come from the cached template
+        template, positions = self._template(tuple(validated_fields))
+        img = template.copy()
         draw = ImageDraw.Draw(img)
-        font = ImageFont.truetype(FONT_PATH, FONT_SIZE)
-
-        y = 20
-        draw.text((20, y), f"ID Card - {user_id}", font=font, fill="black")
-        y += 40
-        for key, value in validated_fields.items():
-            draw.text((20, y), f"{key.capitalize().replace('_', ' ')}: {value}", font=font, fill="black")
-            y += 35
-
-        output_path = os.path.join(OUTPUT_DIR, f"{user_id}.png")
-        img.save(output_path)
-        print(f"Saved: {output_path}")
-
-    def box_convert():
-        os.makedirs(box_dir, exist_ok=True)
-
-        for filename in os.listdir(OUTPUT_DIR):
-            if filename.endswith(".png"):
-                image_path = os.path.join(OUTPUT_DIR, filename)
-                base_name = os.path.splitext(filename)[0] 
-                box_output_path = os.path.join(box_dir, f"{base_name}.box")
-                
-                print(f"Generating .box for: {filename}")
-
-                subprocess.run([
-                    "tesseract",
-                    image_path,
-                    os.path.join(box_dir, base_name),
-                    "batch.nochop",
-                    "makebox"
-                ])
-
-                
-    def my_train_lstmf():
-        for filename in os.listdir(OUTPUT_DIR):
-            if filename.endswith(".png"):
-                base = os.path.splitext(filename)[0]
-                image_path = os.path.join(OUTPUT_DIR, filename)
-                box_path = os.path.join(box_dir, f"{base}.box")
-                gt_path = os.path.join(gt_dir, f"{base}.gt.txt")
-                if not (os.path.exists(box_path) and os.path.exists(gt_path)):
-                    print(f"Skipping {base}: missing .box or .gt.txt")
-                    continue
-
-                # Run lstm.train
-                subprocess.run([
-                    "tesseract",
-                    image_path,
-                    os.path.join(output_lstmf_dir, base),
-                    "--psm", "7",
-                    "lstm.train"
-                ])
+        for position, value in zip(positions, [user_id] + list(validated_fields.values())):
+            draw.text(position, str(value), font=self.font, fill="black")
+
+        return img
+
+
+@lru_cache(maxsize=None)
+def get_renderer():
+    """Per-process renderer shared by every IdCard call"""
+    return CardRenderer()
+
+
+class RenderFailure(NamedTuple):
+    """Stands in for the output path of a card that could not be rendered"""
+    error: str
+
+
+def init_render_worker():
+    """Pool initializer: leave Ctrl+C to the parent, which then terminates the pool
+
+    A worker interrupted while holding the pool's task queue lock dies with it
+    held, and terminate() then waits on that lock forever.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _render_to_file(json_file_path):
+    # A malformed or half-written JSON file fails on its own instead of aborting the whole map
+    try:
+        with open(json_file_path, "r") as f:
+            data = json.load(f)
+        output_path = os.path.join(OUTPUT_DIR, f"{data.get('user_id', 'unknown_id')}.png")
+        # Lossless either way; low zlib effort is much cheaper for bulk generation
+        get_renderer().render(data).save(output_path, compress_level=1)
+    except Exception as e:
+        return RenderFailure(f"{type(e).__name__}: {e}")
+    return output_path
+
 
+class IdCard:
+    @staticmethod
+    def render_id_card(data):
+        """Render card data to an in-memory PIL image"""
+        return get_renderer().render(data)
+
+    @staticmethod
+    def create_id_cards(json_file_paths, workers=None, chunksize=32, pool=None):
+        """Render many cards to OUTPUT_DIR across worker processes and report cards/sec
+
+        Returns one entry per JSON file, in order: its PNG path, or a RenderFailure.
+        Pass an open pool to reuse it across calls instead of starting one per call.
+        """
+        workers = max(1, workers or os.cpu_count() or 1)
+        start = time.perf_counter()
+        if pool is not None:
+            output_paths = pool.map(_render_to_file, json_file_paths, chunksize=chunksize)
+        elif workers == 1:
+            output_paths = [_render_to_file(path) for path in json_file_paths]
+        else:
+            with Pool(workers, initializer=init_render_worker) as pool:
+                output_paths = pool.map(_render_to_file, json_file_paths, chunksize=chunksize)
+        elapsed = time.perf_counter() - start
+        rendered = sum(1 for path in output_paths if not isinstance(path, RenderFailure))
+        rate = rendered / elapsed if elapsed > 0 else 0.0
+        print(f"Rendered {rendered} cards in {elapsed:.2f}s ({rate:.1f} cards/sec, {workers} workers)")
+        return output_paths
+
+    @staticmethod
+    def create_id_card(json_file_path, save=True):
+        with open(json_file_path, "r") as f:
+            data = json.load(f)
+
+        img = IdCard.render_id_card(data)
+
+        if save:
+            output_path = os.path.join(OUTPUT_DIR, f"{data.get('user_id', 'unknown_id')}.png")
+            img.save(output_path)
+            print(f"Saved: {output_path}")
+        return img
+
+    @staticmethod
+    def training_data_builder(workers=None):
+        return TrainingDataBuilder(
+            image_dir=OUTPUT_DIR,
+            json_dir=INPUT_DIR,
+            box_dir=box_dir,
+            gt_dir=gt_dir,
+            lstmf_dir=output_lstmf_dir,
+            workers=workers
+        )
+
+    @staticmethod
+    def box_convert(workers=None):
+        return IdCard.training_data_builder(workers).build_boxes()
+
+    @staticmethod
+    def my_train_lstmf(workers=None):
+        return IdCard.training_data_builder(workers).build_lstmf()
+
+    @staticmethod
     def convert_to_gt():
-        os.makedirs(gt_dir, exist_ok=True)
-        for filename in os.listdir(INPUT_DIR):
-            if filename.endswith(".json"):
-                json_path = os.path.join(INPUT_DIR, filename)
-                with open(json_path, "r") as f:
-                    data = json.load(f)
-
-                user_id = data.get("user_id", "unknown_id")
-                fields = data.get("extracted_fields", {})
-
-                lines = [f"ID Card - {user_id}"]
-                for key, value in fields.items():
-                    line = f"{key.capitalize().replace('_', ' ')}: {value}"
-                    lines.append(line)
-
-                base = os.path.splitext(filename)[0]
-                gt_path = os.path.join(gt_dir, f"{base}.gt.txt")
-                with open(gt_path, "w") as f:
-                    f.write("\n".join(lines))
-
-                print(f"Generated: {gt_path}")
\ No newline at end of file
+        return IdCard.training_data_builder().build_gt()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class IngestManifest:
+    def __init__(self, path: str = ".ingest_manifest.sqlite", settle_seconds: float = 0.0):
+        """Index of ingested files (path, mtime, size, content hash, last result) for incremental runs"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Files modified more recently than this may still be being written
+        self.settle_seconds = settle_seconds
+        self._pending_writes = 0
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT, "
+            "user_id TEXT, result TEXT, confidence REAL, accuracy REAL, updated REAL, error TEXT)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def changed(self, paths: Iterable[str], need_result: bool = False, written: Iterable[str] = ()) -> List[str]:
+        """Paths that are new or whose content changed since they were last recorded
+
+        With need_result, paths recorded without a result (e.g. JSON that was only
+        rendered to PNG) also count as changed; a recorded failure counts as a result,
+        so a bad file is not retried until it changes. Paths in written were just
+        written by this process, so they are complete and skip the settle check.
+        """
+        now = time.time()
+        written = {os.path.normpath(path) for path in written}
+        changed = []
+        for path in paths:
+            stat = os.stat(path)
+            if (self.settle_seconds and now - stat.st_mtime < self.settle_seconds
+                    and os.path.normpath(path) not in written):
+                continue
+            row = self.conn.execute(
+                "SELECT mtime_ns, size, hash, result IS NOT NULL OR error IS NOT NULL FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            if row is None or (need_result and not row[3]):
+                changed.append(path)
+                continue
+            mtime_ns, size, file_hash, _ = row
+            if mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+                continue
+            # Same size and a new mtime (touch, copy, re-render) is often the same content
+            if size == stat.st_size and file_hash == self.hash_file(path):
+                self.conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+                self._pending_writes += 1
+                continue
+            changed.append(path)
+        self.commit()
+        return changed
+
+    def record(self, path: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Mark path as processed in its current state, with its result or the error it failed with"""
+        stat = os.stat(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, user_id, result, confidence, accuracy, updated, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path, stat.st_mtime_ns, stat.st_size, self.hash_file(path),
+                result.get("user_id") if result else None,
+                json.dumps(result) if result is not None else None,
+                result.get("confidence") if result else None,
+                result.get("accuracy") if result else None,
+                time.time(),
+                error
+            )
+        )
+        # Commit in groups; a crash only means re-processing a few cards
+        self._pending_writes += 1
+        if self._pending_writes >= 100:
+            self.commit()
+
+    def result(self, path: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT result FROM files WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics over the last result of every recorded card"""
+        # A card can have results from both its JSON (in-memory runs) and its PNG; the newest wins
+        total, avg_confidence, avg_accuracy = self.conn.execute(
+            "SELECT COUNT(*), AVG(confidence), AVG(accuracy) FROM ("
+            "SELECT confidence, accuracy, MAX(updated) FROM files WHERE result IS NOT NULL GROUP BY user_id)"
+        ).fetchone()
+        return {
+            "total_cards": total,
+            "avg_confidence": avg_confidence or 0.0,
+            "avg_accuracy": avg_accuracy or 0.0
+        }
+
+    def commit(self):
+        if self._pending_writes:
+            self.conn.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,130 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class PipelineMetrics:
+    """Per-stage timers, counters and latency histograms for one pipeline run"""
+
+    def __init__(self, log_dir: str = "logs", profile: bool = False):
+        self.log_dir = log_dir
+        self.stages: Dict[str, List[float]] = {}
+        # failures counts every card without a usable result; errors the subset that raised
+        self.counters: Dict[str, int] = {"cards": 0, "cache_hits": 0, "cache_misses": 0, "failures": 0, "errors": 0}
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        self.profiler = cProfile.Profile() if profile else None
+
+    def observe(self, stage: str, seconds: float):
+        self.stages.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Record the wall time of a block as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def incr(self, counter: str, amount: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def record_card(self, ocr_result: Dict[str, Any]):
+        """Fold one process_id_cards result (its timings and cache_hit fields) into the run totals"""
+        self.incr("cards")
+        self.incr("cache_hits" if ocr_result.get("cache_hit") else "cache_misses")
+        if ocr_result.get("error"):
+            # Reading, OCR or validation raised and the card came back as a failure result
+            self.incr("errors")
+            self.incr("failures")
+        elif not ocr_result.get("extracted_fields"):
+            # OCR or NER produced nothing usable for this card
+            self.incr("failures")
+        if "tier" in ocr_result:
+            # Cascade runs: the tier each card was resolved at, or the best of its unresolved attempts
+            self.incr(f"tier_{ocr_result['tier']}" if ocr_result.get("resolved") else "unresolved")
+        timings = ocr_result.get("timings", {})
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+        self.observe("card", sum(timings.values()))
+
+    @contextmanager
+    def profile(self):
+        """cProfile the block when the run was created with profile=True"""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    @staticmethod
+    def histogram(values: List[float]) -> Dict[str, Any]:
+        latencies = np.asarray(values, dtype=np.float64) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        edges = np.array(HISTOGRAM_BUCKETS_MS + (np.inf,))
+        counts = np.bincount(np.searchsorted(edges, latencies), minlength=len(edges))
+        return {
+            "count": int(latencies.size),
+            "total_ms": float(latencies.sum()),
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(latencies.max()),
+            "buckets": {f"le_{b}" if np.isfinite(b) else "inf": int(c) for b, c in zip(edges, counts)}
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        self.elapsed = time.perf_counter() - self.start
+        cards = self.counters.get("cards", 0)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "elapsed_s": self.elapsed,
+            "throughput_cards_per_s": cards / self.elapsed if self.elapsed > 0 else 0.0,
+            "counters": dict(self.counters),
+            "stages": {stage: self.histogram(values) for stage, values in self.stages.items() if values}
+        }
+
+    def write(self, report: Dict[str, Any] = None) -> str:
+        """Write logs/metrics_<timestamp>.json (and profile_<timestamp>.prof when profiling)"""
+        report = report or self.finish()
+        os.makedirs(self.log_dir, exist_ok=True)
+        stamp = self.started_at.strftime("%Y-%m-%d_%H-%M-%S_%f")
+        if self.profiler is not None:
+            profile_path = os.path.join(self.log_dir, f"profile_{stamp}.prof")
+            self.profiler.dump_stats(profile_path)
+            report["profile"] = profile_path
+        metrics_path = os.path.join(self.log_dir, f"metrics_{stamp}.json")
+        with open(metrics_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return metrics_path
+
+    def print_summary(self, report: Dict[str, Any] = None):
+        report = report or self.finish()
+        print(f"\nRun metrics ({report['elapsed_s']:.2f}s, {report['throughput_cards_per_s']:.2f} cards/sec):")
+        print(f"{'stage':<12} {'count':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        # Slowest stages first
+        for stage, h in sorted(report["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{stage:<12} {h['count']:>7} {h['total_ms'] / 1000:>9.2f} {h['mean_ms']:>9.2f} "
+                  f"{h['p50_ms']:>9.2f} {h['p95_ms']:>9.2f} {h['p99_ms']:>9.2f} {h['max_ms']:>9.2f}")
+        print("  ".join(f"{name}: {value}" for name, value in sorted(report["counters"].items())))
+        if self.profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+            print(stream.getvalue())
@@ -1,22 +1,45 @@
-import spacy
-from spacy.tokens import DocBin
-from spacy.training import Example
+import hashlib
 import json
 import os
 import random
-from typing import List, Dict, Tuple
+import time
+from typing import Container, List, Dict, Tuple, Iterable, Iterator
 import re
+from .field_extractor import get_extractor
+from .scoring import precision_recall_f1
+
+WHITESPACE_RE = re.compile(r'\s+')
+OCR_ARTIFACT_RE = re.compile(r'[^\w\s@.-]')
+
+
+def _clean_span(value: str, start: int) -> Tuple[str, int]:
+    """Drop OCR artifacts and surrounding whitespace from a value found at start in its text"""
+    # The offset moves to the first character that survives the cleanup
+    lead = next((i for i, char in enumerate(value) if not char.isspace() and not OCR_ARTIFACT_RE.match(char)), len(value))
+    return OCR_ARTIFACT_RE.sub('', value).strip(), start + lead
 
 class NERProcessor:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, config_path: str = "config.json"):
         """Initialize NER processor with optional pre-trained model"""
-        if model_path and os.path.exists(model_path):
-            self.nlp = spacy.load(model_path)
-        else:
-            # Create a blank English model with only NER
-            self.nlp = spacy.blank("en")
-            if "ner" not in self.nlp.pipe_names:
-                self.nlp.add_pipe("ner")
+        self.model_path = model_path
+        # spaCy and the model are loaded on first use of self.nlp
+        self._nlp = None
+        # Regex fallbacks from config.json, compiled once
+        self.fallback_extractor = get_extractor("ner_fallback_patterns", config_path)
+    
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            # Imported here so processes that never run NER skip spaCy's import cost
+            import spacy
+            if self.model_path and os.path.exists(self.model_path):
+                self._nlp = spacy.load(self.model_path)
+            else:
+                # Create a blank English model with only NER
+                self._nlp = spacy.blank("en")
+                if "ner" not in self._nlp.pipe_names:
+                    self._nlp.add_pipe("ner")
+        return self._nlp
             
     def prepare_training_data(self, json_dir: str) -> List[Tuple[str, Dict]]:
         """Convert JSON data to spaCy training format with improved text preparation"""
@@ -53,49 +76,133 @@ class NERProcessor:
         
         return training_data
 
-    def train_model(self, training_data: List[Tuple[str, Dict]], output_dir: str, n_iter: int = 50):
-        """Train NER model with improved parameters"""
-        # Get the NER pipe
-        ner = self.nlp.get_pipe("ner")
+    @staticmethod
+    def _corpus_signature(json_dir: str) -> str:
+        """Cheap fingerprint of a JSON directory: file names, sizes and mtimes"""
+        digest = hashlib.sha256()
+        for entry in sorted(os.scandir(json_dir), key=lambda e: e.name):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+    
+    def training_docs(self, json_dir: str, cache_dir: str = ".ner_cache") -> List:
+        """Annotated reference docs for json_dir, converted once and cached as a .spacy DocBin"""
+        from spacy.tokens import DocBin
+        from spacy.training import Example
+        
+        cache_path = os.path.join(cache_dir, f"train_{self._corpus_signature(json_dir)}.spacy")
+        if os.path.exists(cache_path):
+            print(f"Loading cached training docs from {cache_path}")
+            return list(DocBin().from_disk(cache_path).get_docs(self.nlp.vocab))
+        
+        training_data = self.prepare_training_data(json_dir)
+        texts = (text for text, _ in training_data)
+        # tokenizer.pipe batches tokenization; from_dict aligns the character offsets once
+        docs = [
+            Example.from_dict(doc, annotations).reference
+            for doc, (_, annotations) in zip(self.nlp.tokenizer.pipe(texts, batch_size=256), training_data)
+        ]
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop caches of older versions of the corpus
+        for filename in os.listdir(cache_dir):
+            if filename.startswith("train_") and filename.endswith(".spacy"):
+                os.remove(os.path.join(cache_dir, filename))
+        DocBin(docs=docs).to_disk(cache_path)
+        print(f"Cached {len(docs)} training docs to {cache_path}")
+        return docs
+    
+    def _to_examples(self, training_data: List) -> List:
+        """Examples from (text, annotations) pairs or annotated reference docs"""
+        from spacy.tokens import Doc
+        from spacy.training import Example
         
-        # Add labels
-        for _, annotations in training_data:
-            for _, _, label in annotations["entities"]:
-                ner.add_label(label)
+        examples = []
+        for item in training_data:
+            if isinstance(item, Doc):
+                examples.append(Example(self.nlp.make_doc(item.text), item))
+            else:
+                text, annotations = item
+                examples.append(Example.from_dict(self.nlp.make_doc(text), annotations))
+        return examples
+    
+    def train_model(self, training_data: List, output_dir: str, n_iter: int = 50, patience: int = 5,
+                    test_fraction: float = 0.2, dev_fraction: float = 0.1, batch_sizes: Tuple[float, float, float] = (4.0, 32.0, 1.001),
+                    drop: float = 0.2) -> List[Tuple[str, Dict]]:
+        """Train NER model with compounding batches and early stopping on dev-set F1
+        
+        training_data is prepare_training_data output or training_docs output. The dev
+        split picks the stopping point and the saved weights; the test split is never
+        seen during training or model selection and is returned as (text, annotations)
+        pairs for evaluate_model. Both fractions are of the whole data set.
+        """
+        from spacy.util import compounding, minibatch
+        
+        # Examples are built once and reused by every epoch
+        examples = self._to_examples(training_data)
+        
+        # Get the NER pipe and add labels
+        ner = self.nlp.get_pipe("ner")
+        for example in examples:
+            for ent in example.reference.ents:
+                ner.add_label(ent.label_)
         
-        # Split training data
-        random.shuffle(training_data)
-        train_size = int(0.8 * len(training_data))
-        train_data = training_data[:train_size]
-        test_data = training_data[train_size:]
+        # Split into train / dev (early stopping) / test (final report only)
+        random.shuffle(examples)
+        test_size = int(test_fraction * len(examples))
+        dev_size = int(dev_fraction * len(examples))
+        test_examples = examples[:test_size]
+        dev_examples = examples[test_size:test_size + dev_size]
+        train_examples = examples[test_size + dev_size:]
         
         # Initialize the model
-        optimizer = self.nlp.initialize()
+        optimizer = self.nlp.initialize(lambda: train_examples)
         
-        # Training loop
-        batch_size = 4
+        best_f1 = -1.0
+        best_epoch = 0
+        best_model = None
+        sizes = compounding(*batch_sizes)
         for iteration in range(n_iter):
+            start = time.perf_counter()
             losses = {}
-            random.shuffle(train_data)
-            batches = [train_data[i:i + batch_size] for i in range(0, len(train_data), batch_size)]
+            random.shuffle(train_examples)
+            for batch in minibatch(train_examples, size=sizes):
+                self.nlp.update(batch, drop=drop, losses=losses, sgd=optimizer)
+            elapsed = time.perf_counter() - start
             
-            for batch in batches:
-                examples = []
-                for text, annotations in batch:
-                    doc = self.nlp.make_doc(text)
-                    example = Example.from_dict(doc, annotations)
-                    examples.append(example)
-                
-                self.nlp.update(examples, drop=0.2, losses=losses)
+            if not dev_examples:
+                print(f"Iteration {iteration + 1}, Losses: {losses}, {elapsed:.2f}s")
+                continue
             
-            print(f"Iteration {iteration + 1}, Losses: {losses}")
+            dev_f1 = self.nlp.evaluate(dev_examples)["ents_f"] or 0.0
+            print(f"Iteration {iteration + 1}, Losses: {losses}, dev F1: {dev_f1:.2%}, {elapsed:.2f}s")
+            if dev_f1 > best_f1:
+                best_f1, best_epoch = dev_f1, iteration
+                best_model = self.nlp.to_bytes()
+            elif iteration - best_epoch >= patience:
+                print(f"Stopping early: dev F1 has not improved for {patience} iterations")
+                break
         
-        # Save model
+        # Save the best model seen on the dev set
+        if best_model is not None:
+            self.nlp.from_bytes(best_model)
+            print(f"Best dev F1 {best_f1:.2%} at iteration {best_epoch + 1}")
         self.nlp.to_disk(output_dir)
-        return test_data
+        
+        return [
+            (example.reference.text, {"entities": [(ent.start_char, ent.end_char, ent.label_) for ent in example.reference.ents]})
+            for example in test_examples
+        ]
     
-    def evaluate_model(self, test_data: List[Tuple[str, Dict]]) -> Dict:
-        """Evaluate model performance with detailed metrics"""
+    def evaluate_model(self, test_data: Iterable[Tuple[str, Dict]], batch_size: int = 64,
+                       details_path: str = None) -> Dict:
+        """Evaluate model performance with detailed metrics
+        
+        Texts go through nlp.pipe in batches. With details_path, per-example predictions are
+        streamed to that JSONL file instead of kept in results["examples"], so memory stays
+        flat however large the test set is.
+        """
         results = {
             "precision": 0,
             "recall": 0,
@@ -105,100 +212,92 @@ class NERProcessor:
         }
         
         entity_counts = {}
-        for _, annotations in test_data:
-            for _, _, label in annotations["entities"]:
-                if label not in entity_counts:
-                    entity_counts[label] = {"tp": 0, "fp": 0, "fn": 0}
-        
-        for text, annotations in test_data:
-            doc = self.nlp(text)
-            pred_entities = set((ent.start_char, ent.end_char, ent.label_) for ent in doc.ents)
-            true_entities = set(annotations["entities"])
-            
-            # Count matches for each entity type
-            for pred in pred_entities:
-                if pred in true_entities:
-                    entity_counts[pred[2]]["tp"] += 1
+        details = open(details_path, 'w') if details_path else None
+        try:
+            pairs = ((text, annotations) for text, annotations in test_data)
+            for doc, annotations in self.nlp.pipe(pairs, batch_size=batch_size, as_tuples=True):
+                pred_entities = set((ent.start_char, ent.end_char, ent.label_) for ent in doc.ents)
+                true_entities = set(tuple(entity) for entity in annotations["entities"])
+                
+                # Count matches for each entity type
+                for pred in pred_entities:
+                    counts = entity_counts.setdefault(pred[2], {"tp": 0, "fp": 0, "fn": 0})
+                    counts["tp" if pred in true_entities else "fp"] += 1
+                for true in true_entities - pred_entities:
+                    entity_counts.setdefault(true[2], {"tp": 0, "fp": 0, "fn": 0})["fn"] += 1
+                
+                # Store example results
+                example = {
+                    "text": doc.text,
+                    "predicted": sorted(pred_entities),
+                    "actual": sorted(true_entities)
+                }
+                if details is not None:
+                    details.write(json.dumps(example) + "\n")
                 else:
-                    entity_counts[pred[2]]["fp"] += 1
-                    
-            for true in true_entities:
-                if true not in pred_entities:
-                    entity_counts[true[2]]["fn"] += 1
-            
-            # Store example results
-            results["examples"].append({
-                "text": text,
-                "predicted": list(pred_entities),
-                "actual": list(true_entities)
-            })
+                    results["examples"].append(example)
+        finally:
+            if details is not None:
+                details.close()
         
         # Calculate per-entity metrics
         for entity, counts in entity_counts.items():
-            precision = counts["tp"] / (counts["tp"] + counts["fp"]) if (counts["tp"] + counts["fp"]) > 0 else 0
-            recall = counts["tp"] / (counts["tp"] + counts["fn"]) if (counts["tp"] + counts["fn"]) > 0 else 0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            
-            results["per_entity_metrics"][entity] = {
-                "precision": precision,
-                "recall": recall,
-                "f1": f1
-            }
+            results["per_entity_metrics"][entity] = {**precision_recall_f1(counts), **counts}
         
         # Calculate overall metrics
-        total_tp = sum(counts["tp"] for counts in entity_counts.values())
-        total_fp = sum(counts["fp"] for counts in entity_counts.values())
-        total_fn = sum(counts["fn"] for counts in entity_counts.values())
-        
-        precision = total_tp / (total_tp + total_fp) if (total_tp + total_fp) > 0 else 0
-        recall = total_tp / (total_tp + total_fn) if (total_tp + total_fn) > 0 else 0
-        f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-        
-        results.update({
-            "precision": precision,
-            "recall": recall,
-            "f1": f1
-        })
+        totals = {key: sum(counts[key] for counts in entity_counts.values()) for key in ("tp", "fp", "fn")}
+        results.update(precision_recall_f1(totals))
+        if details_path:
+            results["details_path"] = details_path
         
         return results
     
-    def process_text(self, text: str) -> Dict:
-        """Process text using trained NER model with improved pattern matching"""
-        # Preprocess text
+    def _prepare_text(self, text: str) -> str:
+        """Normalize whitespace before NER"""
         text = text.replace('\n', ' ').strip()
-        text = re.sub(r'\s+', ' ', text)
-        
-        doc = self.nlp(text)
-        entities = {}
+        return WHITESPACE_RE.sub(' ', text)
+    
+    def _extract_entity_spans(self, doc, text: str, skip: Container[str] = ()) -> Dict[str, Tuple[str, int]]:
+        """Combine NER entities from a parsed doc with regex fallbacks for fields not in skip, with offsets in text"""
+        spans = {}
         
         # NER extraction with confidence threshold
         for ent in doc.ents:
             if len(ent.text.strip()) > 1:  # Filter out single-character entities
-                entities[ent.label_.lower()] = ent.text.strip()
-        
-        # Enhanced regex patterns with named groups
-        patterns = {
-            "id_number": r"(?:ID|Number|#):\s*(?P<value>\b[A-Z0-9]{6,}\b)",
-            "date": r"(?:Date|DOB):\s*(?P<value>\d{2}[-/]\d{2}[-/]\d{4})",
-            "email": r"(?:Email|E-mail):\s*(?P<value>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)",
-            "phone": r"(?:Phone|Mobile|Tel):\s*(?P<value>(?:\+\d{1,3}[-\s]?)?\d{3}[-\s]?\d{3}[-\s]?\d{4})",
-            "name": r"(?:Name):\s*(?P<value>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            "college": r"(?:College|Institution):\s*(?P<value>[A-Za-z\s.,&\-]+)",
-            "branch": r"(?:Branch|Department):\s*(?P<value>[A-Za-z\s]+)"
-        }
+                spans[ent.label_.lower()] = (ent.text, ent.start_char)
         
-        # Combine regex matches with NER results
-        for field, pattern in patterns.items():
-            if field not in entities:
-                matches = re.search(pattern, text, re.IGNORECASE)
-                if matches:
-                    entities[field] = matches.group('value').strip()
-        
-        # Post-process extracted entities
-        for field, value in entities.items():
-            # Remove common OCR artifacts
-            value = re.sub(r'[^\w\s@.-]', '', value)
-            value = value.strip()
-            entities[field] = value
-            
-        return entities
\ No newline at end of file
+        # Regex fallback only for fields the model did not find
+        spans.update(self.fallback_extractor.extract_spans(text, skip=spans.keys() | set(skip)))
+        
+        # Remove common OCR artifacts
+        return {field: _clean_span(value, start) for field, (value, start) in spans.items()}
+    
+    def _extract_entities(self, doc, text: str, skip: Container[str] = ()) -> Dict:
+        """Combine NER entities from a parsed doc with regex fallbacks for fields not in skip"""
+        return {field: value for field, (value, _) in self._extract_entity_spans(doc, text, skip).items()}
+    
+    def process_text(self, text: str) -> Dict:
+        """Process text using trained NER model with improved pattern matching"""
+        text = self._prepare_text(text)
+        return self._extract_entities(self.nlp(text), text)
+    
+    def process_texts(self, texts: Iterable[str], batch_size: int = 64, n_process: int = 1,
+                      skips: Iterable[Container[str]] = None) -> Iterator[Dict]:
+        """Batched process_text over many OCR outputs using nlp.pipe, yielding results in order
+
+        skips, if given, holds one set of already resolved fields per text; the regex
+        fallbacks do not run for those.
+        """
+        for spans in self.process_texts_with_spans(texts, batch_size, n_process, skips):
+            yield {field: value for field, (value, _) in spans.items()}
+    
+    def process_texts_with_spans(self, texts: Iterable[str], batch_size: int = 64, n_process: int = 1,
+                                 skips: Iterable[Container[str]] = None) -> Iterator[Dict[str, Tuple[str, int]]]:
+        """Like process_texts, with the offset of each value in its whitespace-normalized text"""
+        prepared = (self._prepare_text(text) for text in texts)
+        if skips is None:
+            for doc in self.nlp.pipe(prepared, batch_size=batch_size, n_process=n_process):
+                yield self._extract_entity_spans(doc, doc.text)
+            return
+        for doc, skip in self.nlp.pipe(zip(prepared, skips), batch_size=batch_size, n_process=n_process, as_tuples=True):
+            yield self._extract_entity_spans(doc, doc.text, skip)
\ No newline at end of file
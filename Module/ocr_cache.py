@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+# Part of every key. Bump it when preprocessing or backend code changes what
+# Tesseract returns for the same image and settings, so old entries stop matching.
+CACHE_VERSION = 1
+
+
+class OCRCache:
+    def __init__(self, path: str = ".ocr_cache/ocr_cache.sqlite", max_entries: int = 200000, touch_batch: int = 100):
+        """Persistent cache of raw Tesseract output with least-recently-used eviction
+
+        Hits only read; their access times are written in batches of touch_batch
+        (and on put, evict and close), so a fully cached run does not take the
+        database write lock once per card.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        # key -> access time of hits not yet written to the database
+        self._touched: Dict[str, float] = {}
+
+        # Several worker processes share the file, so wait on locks instead of failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_data ("
+            "key TEXT PRIMARY KEY, ocr_data TEXT, last_access REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_data_last_access ON ocr_data (last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, tesseract_config: str, preprocessing: Dict[str, Any], engine_version: str = "") -> str:
+        """Hash the image together with every setting and version that affects the OCR output"""
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}".encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(image_bytes)
+        digest.update(b"\0")
+        digest.update(tesseract_config.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(preprocessing, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(engine_version.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored image_to_data output or None on a miss"""
+        row = self.conn.execute("SELECT ocr_data FROM ocr_data WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.touch_batch:
+            self.flush_access()
+        return json.loads(row[0])
+
+    def put(self, key: str, ocr_data: Dict[str, Any]):
+        self._touched.pop(key, None)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ocr_data (key, ocr_data, last_access) VALUES (?, ?, ?)",
+            (key, json.dumps(ocr_data), time.time())
+        )
+        # Pending access times ride along with this write's commit
+        self.flush_access(commit=False)
+        self.conn.commit()
+
+        # Counting rows is a table scan, so only check the bound periodically
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= 100:
+            self.evict()
+
+    def flush_access(self, commit: bool = True):
+        """Write the access times of recent hits"""
+        if not self._touched:
+            return
+        self.conn.executemany(
+            "UPDATE ocr_data SET last_access = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._touched.items()]
+        )
+        self._touched.clear()
+        if commit:
+            self.conn.commit()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        self._puts_since_evict = 0
+        self.flush_access()
+        count = self.conn.execute("SELECT COUNT(*) FROM ocr_data").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM ocr_data WHERE key IN "
+                "(SELECT key FROM ocr_data ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.flush_access()
+        self.conn.close()
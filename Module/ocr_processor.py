@@ -1,18 +1,90 @@
 import cv2
 import numpy as np
-import pytesseract
 import json
 import os
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from PIL import Image
-from typing import Dict, Any, Tuple
-from .ner_processor import NERProcessor
+from typing import Callable, Dict, Any, List, Set, Tuple, Union
+from .ner_processor import OCR_ARTIFACT_RE, NERProcessor
+from .ocr_cache import OCRCache
+from .field_extractor import FieldExtractor, get_extractor
+from .ocr_result import OCRWords
+from .tesseract_backend import build_config_string, create_backend
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Fields a card must have, read confidently, before NER can be skipped
+DEFAULT_REQUIRED_FIELDS = ["name", "college", "roll_number", "branch"]
+# Card label -> field, for reading labelled lines and trimming labels off values
+DEFAULT_FIELD_LABELS = {
+    "Name": "name",
+    "College": "college",
+    "Roll number": "roll_number",
+    "Branch": "branch",
+    "Valid upto": "valid_upto"
+}
+# "Label: value" on a single card line
+LABELED_LINE_RE = re.compile(r'^\s*([A-Za-z][A-Za-z ]*?)\s*:\s*(.*?)\s*$')
+
+# A card image: a file path, a BGR/grayscale array or a PIL image rendered in memory
+ImageInput = Union[str, np.ndarray, Image.Image]
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], stage: str):
+    """Accumulate the wall time of a block into timings[stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
 
 class OCRProcessor:
     def __init__(self, config_path: str = "config.json"):
         self.config = self._load_config(config_path)
+        self.config_path = config_path
         self.setup_tesseract()
-        self.ner = NERProcessor(model_path="trained_models/ner")
+        # With use_ner false only the regex patterns run and spaCy is never imported
+        self.use_ner = self.config.get("extraction", {}).get("use_ner", True)
+        # Labelled fields read at this Tesseract confidence or better are final
+        self.min_field_confidence = self.config.get("extraction", {}).get("min_field_confidence", 80)
+        self.required_fields = self.config.get("extraction", {}).get("required_fields", DEFAULT_REQUIRED_FIELDS)
+        self.field_labels = {
+            label.lower(): field
+            for label, field in self.config.get("extraction", {}).get("labels", DEFAULT_FIELD_LABELS).items()
+        }
+        # Case-sensitive patterns stop inside a multi-word label at its lowercase word ("... Roll number"),
+        # so its first word is trimmed too; longest first, so a whole label wins over its first word
+        self._trim_labels = sorted(set(self.field_labels) | {label.split()[0] for label in self.field_labels},
+                                   key=len, reverse=True)
+        self._ner = None
+        self.cache = self._setup_cache()
+        self.last_cache_hit = False
+        self.last_timings = {}
+        self.last_scores = {}
+        # Word-level result of the last extract_text call
+        self.last_words = None
+        self.field_extractor = FieldExtractor.from_config(self.config, "field_patterns")
+        self.layout = self.config.get("layout", {})
+        self._line_backends = threading.local()
+        # Every line backend, whichever thread made it, so close() can release them
+        self._all_line_backends = []
+        self._line_backends_lock = threading.Lock()
+        # Line OCR threads live as long as the processor, so each keeps its engine
+        self._line_executor = None
+        self.cascade = self._setup_cascade()
+    
+    @property
+    def ner(self) -> NERProcessor:
+        """NER processor, created (and its model loaded) on first use"""
+        if self._ner is None:
+            self._ner = NERProcessor(model_path="trained_models/ner", config_path=self.config_path)
+        return self._ner
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         if os.path.exists(config_path):
@@ -35,125 +107,367 @@ class OCRProcessor:
             }
         }
 
+    def _setup_cache(self):
+        """Open the on-disk OCR cache if enabled in config"""
+        cache_config = self.config.get("cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        return OCRCache(
+            path=cache_config.get("path", ".ocr_cache/ocr_cache.sqlite"),
+            max_entries=cache_config.get("max_entries", 200000)
+        )
+
     def setup_tesseract(self):
         """Configure Tesseract with optimal parameters"""
-        self.tesseract_config = f'-l {self.config["tesseract"]["lang"]} --oem {self.config["tesseract"]["oem"]} --psm {self.config["tesseract"]["psm"]} {self.config["tesseract"]["config_params"]}'
-
-    def deskew(self, image: np.ndarray) -> np.ndarray:
-        """Deskew the image if it's rotated"""
-        coords = np.column_stack(np.where(image > 0))
-        angle = cv2.minAreaRect(coords)[-1]
-        if angle < -45:
-            angle = 90 + angle
-        if angle > 0:
-            (h, w) = image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            image = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-        return image
+        self.tesseract_settings = self.config["tesseract"]
+        self.tesseract_config = build_config_string(self.tesseract_settings)
+        self.backend = create_backend(self.tesseract_settings)
+        self.preprocessing_config = self.config.get("preprocessing", {})
 
-    def preprocess_image(self, image_path: str) -> np.ndarray:
-        """Apply enhanced preprocessing steps to improve OCR accuracy"""
-        # Read image
-        img = cv2.imread(image_path)
+    def _setup_cascade(self) -> List[Dict[str, Any]]:
+        """Cascade tiers, cheapest first, each with its preprocessing and Tesseract setup"""
+        cascade = self.config.get("cascade", {})
+        if not cascade.get("enabled", False):
+            return []
+        tiers = []
+        for tier in cascade.get("tiers", []):
+            # Tiers override the base sections, so an empty tier is the configured pipeline
+            tesseract_config = {**self.config["tesseract"], **tier.get("tesseract", {})}
+            tiers.append({
+                "name": tier["name"],
+                "preprocessing": {**self.config.get("preprocessing", {}), **tier.get("preprocessing", {})},
+                "tesseract_settings": tesseract_config,
+                "tesseract_config": build_config_string(tesseract_config),
+                "backend": create_backend(tesseract_config)
+            })
+        return tiers
+
+    @contextmanager
+    def _use_tier(self, tier: Dict[str, Any]):
+        """Run a block with a cascade tier's preprocessing and Tesseract settings"""
+        saved = self.preprocessing_config, self.tesseract_settings, self.tesseract_config, self.backend
+        self.preprocessing_config = tier["preprocessing"]
+        self.tesseract_settings = tier["tesseract_settings"]
+        self.tesseract_config = tier["tesseract_config"]
+        self.backend = tier["backend"]
+        try:
+            yield
+        finally:
+            self.preprocessing_config, self.tesseract_settings, self.tesseract_config, self.backend = saved
+
+    @staticmethod
+    def estimate_skew(image: np.ndarray, max_angle: float = 15.0, max_points: int = 20000) -> float:
+        """Skew of the text foreground in degrees, from a downsampled projection profile"""
+        # Text is black on white after thresholding; work on a small copy
+        scale = min(1.0, 800 / image.shape[1])
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ys, xs = np.nonzero(image < 128)
+        if len(ys) < 50:
+            return 0.0
         
-        # Get preprocessing config with defaults
-        config = self.config.get("preprocessing", {})
-        resize_width = config.get("resize_width", 2400)
-        threshold_method = config.get("threshold_method", "adaptive")
-        use_denoise = config.get("denoise", True)
-        use_sharpen = config.get("sharpen", True)
-        use_deskew = config.get("deskew", True)
-        use_morph_cleanup = config.get("morph_cleanup", True)
+        # Subsample so memory stays bounded regardless of image size
+        step = max(1, len(ys) // max_points)
+        xs = xs[::step].astype(np.float32)
+        ys = ys[::step].astype(np.float32)
+        xs -= xs.mean()
+        ys -= ys.mean()
         
+        def best_angle(angles: np.ndarray) -> float:
+            # Project every point for every candidate angle at once; text lines
+            # give the sharpest row histogram when the angle matches the skew
+            radians = np.deg2rad(angles).astype(np.float32)
+            rows = np.outer(np.cos(radians), ys) - np.outer(np.sin(radians), xs)
+            bins = (rows - rows.min(axis=1, keepdims=True)).astype(np.int64)
+            n_bins = int(bins.max()) + 1
+            bins += np.arange(len(angles))[:, None] * n_bins
+            hist = np.bincount(bins.ravel(), minlength=len(angles) * n_bins).reshape(len(angles), n_bins)
+            sharpness = (hist.astype(np.float64) ** 2).sum(axis=1)
+            return round(float(angles[np.argmax(sharpness)]), 2)
+        
+        coarse = best_angle(np.arange(-max_angle, max_angle + 0.5, 1.0))
+        return best_angle(np.arange(coarse - 1.0, coarse + 1.05, 0.1))
+
+    def deskew(self, image: np.ndarray, dst: np.ndarray = None) -> np.ndarray:
+        """Deskew the image if it's rotated, into dst when given"""
+        settings = self.preprocessing_settings()
+        angle = self.estimate_skew(image, max_angle=settings["deskew_max_angle"])
+        # Rotating costs a full-image warp, so skip it for negligible skew
+        if abs(angle) < settings["deskew_tolerance"]:
+            if dst is None:
+                return image
+            np.copyto(dst, image)
+            return dst
+        (h, w) = image.shape[:2]
+        center = (w // 2, h // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        return cv2.warpAffine(image, M, (w, h), dst=dst, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+    def preprocessing_settings(self) -> Dict[str, Any]:
+        """Effective preprocessing config with defaults filled in"""
+        config = self.preprocessing_config
+        return {
+            "mode": config.get("mode", "full"),
+            "resize_width": config.get("resize_width", 2400),
+            "threshold_method": config.get("threshold_method", "adaptive"),
+            "denoise": config.get("denoise", True),
+            "sharpen": config.get("sharpen", True),
+            "deskew": config.get("deskew", True),
+            "morph_cleanup": config.get("morph_cleanup", True),
+            "deskew_tolerance": config.get("deskew_tolerance", 0.2),
+            "deskew_max_angle": config.get("deskew_max_angle", 15.0),
+            # Tiered mode only: denoise/sharpen are applied when these scores call for it
+            "noise_threshold": config.get("noise_threshold", 4.0),
+            "blur_threshold": config.get("blur_threshold", 100.0),
+            "target_line_height": config.get("target_line_height", 48)
+        }
+
+    @staticmethod
+    def noise_score(gray: np.ndarray) -> float:
+        """Estimate the noise standard deviation (Immerkaer's method)"""
+        kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+        response = cv2.filter2D(gray.astype(np.float32), -1, kernel)
+        h, w = gray.shape[:2]
+        return float(np.sqrt(np.pi / 2) * np.abs(response[1:-1, 1:-1]).sum() / (6 * (w - 2) * (h - 2)))
+
+    @staticmethod
+    def blur_score(gray: np.ndarray) -> float:
+        """Variance of the Laplacian; low values mean a blurry image"""
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    @staticmethod
+    def text_regions(gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Bounding boxes (x, y, w, h) of text lines found at native resolution"""
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+        mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        # Join characters of a line horizontally without merging neighbouring lines
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1)))
+        contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w > 8 and h > 6:
+                regions.append((x, y, w, h))
+        return regions
+
+    def _preprocess_full(self, img: np.ndarray, settings: Dict[str, Any], timings: Dict[str, float]) -> np.ndarray:
+        """Upscale to resize_width, then denoise and sharpen the whole card"""
         # Resize while maintaining aspect ratio
-        scale = resize_width / img.shape[1]
-        width = int(img.shape[1] * scale)
-        height = int(img.shape[0] * scale)
-        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_LANCZOS4)
+        with _timed(timings, "resize"):
+            scale = settings["resize_width"] / img.shape[1]
+            width = int(img.shape[1] * scale)
+            height = int(img.shape[0] * scale)
+            img = cv2.resize(img, (width, height), interpolation=cv2.INTER_LANCZOS4)
         
         # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        with _timed(timings, "grayscale"):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
         # Apply denoising if configured
-        if use_denoise:
-            gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+        if settings["denoise"]:
+            with _timed(timings, "denoise"):
+                gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
         
         # Apply sharpening if configured
-        if use_sharpen:
-            kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-            gray = cv2.filter2D(gray, -1, kernel)
+        if settings["sharpen"]:
+            with _timed(timings, "sharpen"):
+                kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
+                gray = cv2.filter2D(gray, -1, kernel)
         
-        # Apply thresholding with better parameters
-        if threshold_method == "adaptive":
-            binary = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 21, 11
-            )
+        return gray
+
+    def _preprocess_tiered(self, img: np.ndarray, settings: Dict[str, Any], timings: Dict[str, float]) -> np.ndarray:
+        """Cheap analysis at native resolution; expensive steps only where the scores call for them"""
+        with _timed(timings, "grayscale"):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        
+        with _timed(timings, "analysis"):
+            noise = self.noise_score(gray)
+            blur = self.blur_score(gray)
+            regions = self.text_regions(gray)
+        self.last_scores = {"noise": noise, "blur": blur}
+        
+        # Upscale only until text lines reach the height Tesseract reads best,
+        # never beyond resize_width
+        with _timed(timings, "resize"):
+            max_scale = settings["resize_width"] / gray.shape[1]
+            if regions:
+                line_height = float(np.median([h for _, _, _, h in regions]))
+                scale = min(max(settings["target_line_height"] / line_height, 1.0), max_scale)
+            else:
+                scale = max_scale
+            if scale != 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        
+        # Denoise and sharpen only the text lines, padded so filter windows and
+        # marks below the line box (underscores, descenders) stay inside
+        height, width = gray.shape[:2]
+        rois = []
+        for x, y, w, h in regions:
+            pad = 4 + int(0.25 * h * scale)
+            x0, y0 = max(int(x * scale) - pad, 0), max(int(y * scale) - pad, 0)
+            x1, y1 = min(int((x + w) * scale) + pad, width), min(int((y + h) * scale) + pad, height)
+            rois.append((slice(y0, y1), slice(x0, x1)))
+        
+        if settings["denoise"] and noise > settings["noise_threshold"] and rois:
+            with _timed(timings, "denoise"):
+                # Outside the text lines noise only matters to thresholding, so flatten it
+                text_mask = np.zeros(gray.shape[:2], dtype=bool)
+                for roi in rois:
+                    text_mask[roi] = True
+                gray[~text_mask] = int(np.median(gray))
+                for roi in rois:
+                    gray[roi] = cv2.fastNlMeansDenoising(gray[roi], None, 10, 7, 21)
+        
+        if settings["sharpen"] and blur < settings["blur_threshold"]:
+            with _timed(timings, "sharpen"):
+                kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
+                for roi in rois:
+                    gray[roi] = cv2.filter2D(gray[roi], -1, kernel)
+        
+        return gray
+
+    @staticmethod
+    def load_image(image: ImageInput) -> np.ndarray:
+        """Read a path, or convert an in-memory image, to a BGR array"""
+        if isinstance(image, str):
+            img = cv2.imread(image)
+            # imread signals a missing or undecodable file with None rather than raising
+            if img is None:
+                raise ValueError(f"Could not read image {image}")
+            return img
+        if isinstance(image, Image.Image):
+            return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return image
+
+    @staticmethod
+    def image_bytes(image: ImageInput) -> bytes:
+        """Bytes identifying an image's content, for cache keys"""
+        if isinstance(image, str):
+            with open(image, 'rb') as f:
+                return f.read()
+        if isinstance(image, Image.Image):
+            image = np.asarray(image)
+        return str(image.shape).encode("utf-8") + np.ascontiguousarray(image).tobytes()
+
+    def preprocess_image(self, image: ImageInput, allocate: Callable[[Tuple[int, ...]], np.ndarray] = None) -> np.ndarray:
+        """Apply enhanced preprocessing steps to improve OCR accuracy
+
+        With allocate, the last step writes its output into allocate(shape), e.g. a
+        shared-memory slot, instead of a new array; allocate may return None to decline.
+        """
+        timings = {}
+        self.last_timings = timings
+        
+        # Read image
+        with _timed(timings, "read"):
+            img = self.load_image(image)
+        
+        settings = self.preprocessing_settings()
+        if settings["mode"] == "tiered":
+            gray = self._preprocess_tiered(img, settings, timings)
         else:
-            binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+            gray = self._preprocess_full(img, settings, timings)
+        
+        # Thresholding, deskew and morph keep the shape, so the output array is known now
+        out = allocate(gray.shape) if allocate is not None else None
+        last = "morph" if settings["morph_cleanup"] else "deskew" if settings["deskew"] else "threshold"
+        
+        # Apply thresholding with better parameters
+        with _timed(timings, "threshold"):
+            dst = out if last == "threshold" else None
+            if settings["threshold_method"] == "adaptive":
+                binary = cv2.adaptiveThreshold(
+                    gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                    cv2.THRESH_BINARY, 21, 11, dst=dst
+                )
+            else:
+                binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)[1]
         
         # Deskew if configured
-        if use_deskew:
-            binary = self.deskew(binary)
+        if settings["deskew"]:
+            with _timed(timings, "deskew"):
+                binary = self.deskew(binary, dst=out if last == "deskew" else None)
         
         # Apply morphological operations to clean up the image
-        if use_morph_cleanup:
-            kernel = np.ones((2,2), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        if settings["morph_cleanup"]:
+            with _timed(timings, "morph"):
+                kernel = np.ones((2,2), np.uint8)
+                binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, dst=out)
         
         return binary
 
-    def extract_text(self, image_path: str) -> Tuple[str, float]:
-        """Extract text from image with improved confidence calculation"""
-        # Preprocess image
-        processed_img = self.preprocess_image(image_path)
-        
-        # Convert OpenCV image to PIL Image
-        pil_img = Image.fromarray(processed_img)
-        
-        # Get OCR data including confidence
-        ocr_data = pytesseract.image_to_data(
-            pil_img, 
-            config=self.tesseract_config, 
-            output_type=pytesseract.Output.DICT
+    def text_cache_key(self, image: ImageInput) -> str:
+        """OCR cache key for an image under the current settings, or None without a cache"""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(
+            self.image_bytes(image),
+            f"{self.backend.name}:{self.tesseract_config}",
+            self.preprocessing_settings(),
+            self.backend.version
         )
+
+    def cached_text(self, cache_key: str) -> Tuple[str, float]:
+        """(text, confidence) for the Tesseract output stored under cache_key, or None on a miss"""
+        self.last_cache_hit = False
+        if cache_key is None:
+            return None
+        ocr_data = self.cache.get(cache_key)
+        if ocr_data is None:
+            return None
+        self.last_cache_hit = True
+        return self.text_from_data(ocr_data)
+
+    def text_from_data(self, ocr_data: Dict[str, List]) -> Tuple[str, float]:
+        """Cleaned text and confidence of a Tesseract image_to_data result"""
+        # Filter words and compute the length-weighted confidence over columnar arrays
+        words = OCRWords.from_tesseract(ocr_data).filter(min_conf=30)
+        self.last_words = words
         
-        # Extract text and calculate weighted confidence
-        text_parts = []
-        confidences = []
-        word_lengths = []
-        
-        for i in range(len(ocr_data["text"])):
-            if int(ocr_data["conf"][i]) > 30:  # Increased confidence threshold
-                text = ocr_data["text"][i].strip()
-                if text:  # Only process non-empty text
-                    text_parts.append(text)
-                    confidences.append(float(ocr_data["conf"][i]))
-                    word_lengths.append(len(text))
-        
-        if not confidences:
+        if not len(words):
             return "", 0.0
         
-        # Calculate length-weighted confidence
-        total_length = sum(word_lengths)
-        weighted_confidence = sum(conf * length for conf, length in zip(confidences, word_lengths)) / total_length if total_length > 0 else 0.0
-        
-        # Join text parts with proper spacing
-        extracted_text = " ".join(text_parts)
+        weighted_confidence = words.weighted_confidence()
         
         # Clean the extracted text
-        cleaned_text = self.clean_text(extracted_text)
+        cleaned_text = self.clean_text(words.joined_text())
         
         return cleaned_text, weighted_confidence
 
+    def recognize(self, processed_img: np.ndarray, cache_key: str = None) -> Tuple[str, float]:
+        """Run Tesseract on an already preprocessed image and cache its output under cache_key"""
+        # Get OCR data including confidence
+        with _timed(self.last_timings, "tesseract"):
+            ocr_data = self.backend.image_to_data(processed_img)
+        
+        # Only Tesseract's raw output is cached; filtering and cleaning rerun on every hit
+        if cache_key is not None:
+            self.cache.put(cache_key, ocr_data)
+        
+        return self.text_from_data(ocr_data)
+
+    def extract_text(self, image: ImageInput) -> Tuple[str, float]:
+        """Extract text from image with improved confidence calculation"""
+        self.last_timings = {}
+        cache_key = self.text_cache_key(image)
+        cached = self.cached_text(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Preprocess image
+        processed_img = self.preprocess_image(image)
+        return self.recognize(processed_img, cache_key)
+
     def clean_text(self, text: str) -> str:
         """Enhanced text cleaning"""
         # Remove non-printable characters
         text = "".join(char for char in text if char.isprintable())
         
         # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         
         # Fix common OCR mistakes
         text = text.replace('0', 'O').replace('1', 'I').replace('5', 'S')
@@ -164,42 +478,310 @@ class OCRProcessor:
         return text
 
     def extract_fields(self, text: str) -> Dict[str, str]:
-        """Extract specific fields using regex patterns"""
-        patterns = {
-            "name": r"Name:\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            "college": r"College:\s*([A-Za-z\s.,&\-]+)",
-            "roll_number": r"Roll Number:\s*([A-Z0-9]{6,15})",
-            "branch": r"Branch:\s*([A-Za-z\s]+)"
-        }
-        
-        extracted_fields = {}
-        for field, pattern in patterns.items():
-            match = re.search(pattern, text)
-            if match:
-                extracted_fields[field] = match.group(1).strip()
-        
-        return extracted_fields
+        """Extract specific fields using the configured regex patterns"""
+        return self.field_extractor.extract(text)
 
-    def process_id_card(self, image_path: str) -> Dict[str, Any]:
-        """Process ID card image with improved OCR and NER"""
-        # Perform enhanced OCR
-        raw_text, confidence = self.extract_text(image_path)
+    def extract_regex_fields(self, text: str) -> Dict[str, str]:
+        """Regex-only extraction: labelled field patterns first, then the NER fallback patterns"""
+        return {field: value for field, (value, _) in self.extract_regex_spans(text).items()}
+
+    def extract_regex_spans(self, text: str) -> Dict[str, Tuple[str, int]]:
+        """Like extract_regex_fields, with the offset of each value in text"""
+        spans = self.field_extractor.extract_spans(text)
+        spans.update(get_extractor("ner_fallback_patterns", self.config_path).extract_spans(text, skip=spans))
+        # Trimming a label only shortens the end, so offsets still hold
+        return {field: (self.trim_label(value), start) for field, (value, start) in spans.items()}
+
+    def trim_label(self, value: str) -> str:
+        """Drop a trailing card label from a value"""
+        # Card lines are joined into one string, so a value can run into the next line's label
+        for label in self._trim_labels:
+            if value.lower().endswith(" " + label):
+                return value[:-len(label)].rstrip()
+        return value
+
+    def fast_fields(self, text: str, words: OCRWords = None) -> Tuple[Dict[str, str], Dict[str, float]]:
+        """Fields read by the labelled patterns, with the Tesseract confidence of the words behind each"""
+        fields = {}
+        field_confidence = {}
+        for field, (value, start) in self.field_extractor.extract_spans(text).items():
+            value = self.trim_label(value)
+            fields[field] = value
+            field_confidence[field] = words.span_confidence(start, start + len(value)) if words is not None else 0.0
+        return fields, field_confidence
+
+    def needs_ner(self, field_confidence: Dict[str, float]) -> bool:
+        """Early exit: False once every required field was read with min_field_confidence"""
+        return any(field_confidence.get(field, 0.0) < self.min_field_confidence for field in self.required_fields)
+
+    def _confident_fields(self, card: Dict[str, Any]) -> Set[str]:
+        return {field for field, confidence in card["field_confidence"].items() if confidence >= self.min_field_confidence}
+
+    def _merge_fields(self, card: Dict[str, Any], found: Dict[str, Tuple[str, int]]):
+        """Take NER or fallback values (with their offsets) for every field the fast rules did not read confidently"""
+        confident = self._confident_fields(card)
+        words = card.get("words")
+        for field, (value, start) in found.items():
+            if field in confident:
+                continue
+            # Trimmed here too, so the confidence covers only the value's own words
+            value = self.trim_label(value)
+            card["extracted_fields"][field] = value
+            # Offsets index raw_text (NER's whitespace normalization leaves it unchanged),
+            # so the words under the span give the field's confidence
+            if words is not None:
+                card["field_confidence"][field] = words.span_confidence(start, start + len(value))
+            else:
+                card["field_confidence"].pop(field, None)
+
+    def _line_backend(self, line_config: Dict[str, Any]):
+        """Single-line psm backend for a Tesseract setup, one per thread since engines are not thread-safe"""
+        backends = getattr(self._line_backends, "by_config", None)
+        if backends is None:
+            backends = self._line_backends.by_config = {}
+        # Keyed by the whole setup, so each cascade tier gets its own engine settings
+        key = json.dumps(line_config, sort_keys=True)
+        if key not in backends:
+            backends[key] = create_backend(line_config)
+            with self._line_backends_lock:
+                self._all_line_backends.append(backends[key])
+        return backends[key]
+
+    @property
+    def line_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for layout line OCR, created on first use"""
+        if self._line_executor is None:
+            self._line_executor = ThreadPoolExecutor(max_workers=self.layout.get("workers", 4))
+        return self._line_executor
+
+    def close(self):
+        """Stop the line OCR threads, release every Tesseract engine and write pending cache access times"""
+        if self._line_executor is not None:
+            self._line_executor.shutdown()
+            self._line_executor = None
+        with self._line_backends_lock:
+            backends, self._all_line_backends = self._all_line_backends, []
+        backends += [self.backend] + [tier["backend"] for tier in self.cascade]
+        for backend in backends:
+            backend.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def _ocr_line(self, line_config: Dict[str, Any], crop: np.ndarray) -> Dict[str, List]:
+        return self._line_backend(line_config).image_to_data(crop)
+
+    def layout_cache_key(self, image: ImageInput, line_config: Dict[str, Any]) -> str:
+        """OCR cache key for a card's layout line results, or None without a cache"""
+        if self.cache is None:
+            return None
+        # Only the settings that decide the crops and how they are read; labels are applied after
+        layout = {key: self.layout.get(key) for key in ("reference_width", "lines", "min_line_pixels")}
+        return self.cache.make_key(
+            self.image_bytes(image),
+            f"layout:{self.backend.name}:{build_config_string(line_config)}",
+            {**self.preprocessing_settings(), "layout": layout},
+            self.backend.version
+        )
+
+    def extract_layout_fields(self, image: ImageInput) -> Tuple[str, float, Dict[str, str], Dict[str, float], bool]:
+        """OCR each configured card line with single-line psm and read fields by their label
+
+        The raw Tesseract output of every line is cached together, so a hit skips
+        preprocessing and all of the card's line OCR.
+        """
+        # The active tier's Tesseract setup; each line thread keeps an engine per setup
+        line_config = dict(self.tesseract_settings, psm=self.layout.get("psm", 7))
+        cache_key = self.layout_cache_key(image, line_config)
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        self.last_cache_hit = cached is not None
+        if cached is not None:
+            self.last_timings = {}
+            line_data = cached["lines"]
+        else:
+            processed_img = self.preprocess_image(image)
+            
+            # Line regions are given in reference card coordinates
+            scale = processed_img.shape[1] / self.layout.get("reference_width", 600)
+            min_pixels = self.layout.get("min_line_pixels", 20)
+            crops = []
+            for line in self.layout.get("lines", []):
+                top = int(line["top"] * scale)
+                bottom = min(int((line["top"] + line["height"]) * scale), processed_img.shape[0])
+                crop = processed_img[top:bottom]
+                # Skip blank lines without calling Tesseract
+                if crop.size and np.count_nonzero(crop < 128) >= min_pixels:
+                    crops.append(crop)
+            
+            with _timed(self.last_timings, "tesseract"):
+                line_data = list(self.line_executor.map(partial(self._ocr_line, line_config), crops))
+            if cache_key is not None:
+                self.cache.put(cache_key, {"lines": line_data})
+        line_words = [OCRWords.from_tesseract(data).filter(min_conf=30) for data in line_data]
         
-        # Process with NER
-        extracted_fields = self.ner.process_text(raw_text)
+        lines_text = []
+        fields = {}
+        field_confidence = {}
+        all_resolved = True
+        for words in line_words:
+            if not len(words):
+                continue
+            text = self.clean_text(words.joined_text())
+            lines_text.append(text)
+            match = LABELED_LINE_RE.match(text)
+            field = self.field_labels.get(match.group(1).lower()) if match else None
+            if field is None:
+                # Header lines carry no field; anything else is left to NER
+                if ":" in text:
+                    all_resolved = False
+                continue
+            fields[field] = match.group(2)
+            field_confidence[field] = words.span_confidence(match.start(2), match.end(2))
         
-        # Post-process extracted fields
+        if not line_words or not any(len(words) for words in line_words):
+            return "", 0.0, fields, field_confidence, all_resolved
+        
+        # Card-level confidence over every recognized word, as in extract_text
+        total_length = sum(int(words.lengths.sum()) for words in line_words)
+        weighted = sum(float(np.dot(words.conf, words.lengths)) for words in line_words)
+        confidence = weighted / total_length if total_length else 0.0
+        return " ".join(lines_text), confidence, fields, field_confidence, all_resolved
+
+    def postprocess_fields(self, extracted_fields: Dict[str, str]) -> Dict[str, str]:
+        """Clean and normalize a card's fields, whether fast rules, layout, NER or the fallbacks read them"""
         processed_fields = {}
         for field, value in extracted_fields.items():
-            # Clean and normalize field values
-            cleaned_value = self.clean_text(str(value))
+            # Values are cut from text clean_text already produced; artifact removal and
+            # label trimming run here for every path, so a value does not depend on which one read it
+            cleaned_value = self.trim_label(WHITESPACE_RE.sub(' ', OCR_ARTIFACT_RE.sub('', str(value))).strip())
             # Convert to uppercase for consistency
             if field in ['name', 'college', 'branch']:
                 cleaned_value = cleaned_value.upper()
             processed_fields[field] = cleaned_value
-        
+        return processed_fields
+
+    def _ocr_attempt(self, image: ImageInput) -> Dict[str, Any]:
+        """One OCR pass over a card with the current preprocessing and Tesseract settings"""
+        if self.layout.get("enabled", False):
+            raw_text, confidence, fields, field_confidence, all_resolved = self.extract_layout_fields(image)
+            return {
+                "confidence": confidence,
+                "raw_text": raw_text,
+                "extracted_fields": fields,
+                "field_confidence": field_confidence,
+                "cache_hit": self.last_cache_hit,
+                "timings": self.last_timings,
+                "needs_ner": not all_resolved or not fields or self.needs_ner(field_confidence)
+            }
+        raw_text, confidence = self.extract_text(image)
+        return self.text_card(raw_text, confidence)
+
+    def text_card(self, raw_text: str, confidence: float) -> Dict[str, Any]:
+        """Card for whole-card OCR text, with the fields the labelled patterns read"""
+        with _timed(self.last_timings, "fast_rules"):
+            fields, field_confidence = self.fast_fields(raw_text, self.last_words)
         return {
             "confidence": confidence,
             "raw_text": raw_text,
-            "extracted_fields": processed_fields
-        } 
\ No newline at end of file
+            "extracted_fields": fields,
+            "field_confidence": field_confidence,
+            "cache_hit": self.last_cache_hit,
+            "timings": self.last_timings,
+            "needs_ner": self.needs_ner(field_confidence),
+            # Word boxes for NER field confidence; dropped before the card is returned
+            "words": self.last_words
+        }
+
+    def field_coverage(self, card: Dict[str, Any]) -> float:
+        """Fraction of the cascade's required fields found in an OCR attempt"""
+        required = self.config["cascade"].get("required_fields", ["name", "college", "roll_number", "branch"])
+        # Label patterns are a cheap stand-in for NER; layout fields count as found
+        fields = {**self.extract_regex_fields(card["raw_text"]), **card["extracted_fields"]}
+        return sum(1 for field in required if fields.get(field)) / len(required) if required else 1.0
+
+    def _ocr_card(self, image: ImageInput) -> Dict[str, Any]:
+        """OCR stage for one card; needs_ner marks cards that still need the NER pass
+
+        With the cascade enabled the card is read by the cheapest tier first and
+        escalated while its confidence or field coverage is below the thresholds.
+        """
+        if not self.cascade:
+            return self._ocr_attempt(image)
+
+        min_confidence = self.config.get("extraction", {}).get("min_confidence", 60)
+        min_coverage = self.config["cascade"].get("min_field_coverage", 0.75)
+        timings: Dict[str, float] = {}
+        best, best_score = None, None
+        for tier in self.cascade:
+            with self._use_tier(tier):
+                card = self._ocr_attempt(image)
+            with _timed(card["timings"], "cascade"):
+                coverage = self.field_coverage(card)
+            for stage, seconds in card["timings"].items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+            card["tier"] = tier["name"]
+            card["resolved"] = card["confidence"] >= min_confidence and coverage >= min_coverage
+            if card["resolved"]:
+                best = card
+                break
+            # Nothing resolved yet: keep the attempt with the most fields, then the highest confidence
+            if best_score is None or (coverage, card["confidence"]) > best_score:
+                best, best_score = card, (coverage, card["confidence"])
+        best["timings"] = timings
+        return best
+
+    def failed_card(self, error: Exception) -> Dict[str, Any]:
+        """Result for a card that could not be read, so one bad image does not fail its whole batch"""
+        return {
+            "confidence": 0.0,
+            "raw_text": "",
+            "extracted_fields": {},
+            "field_confidence": {},
+            "cache_hit": False,
+            "timings": {},
+            "needs_ner": False,
+            "error": f"{type(error).__name__}: {error}"
+        }
+
+    def _ocr_card_or_failure(self, image: ImageInput) -> Dict[str, Any]:
+        try:
+            return self._ocr_card(image)
+        except Exception as e:
+            return self.failed_card(e)
+
+    def process_id_card(self, image: ImageInput) -> Dict[str, Any]:
+        """Process ID card image with improved OCR and NER"""
+        return self.process_id_cards([image], batch_size=1)[0]
+
+    def process_id_cards(self, images: List[ImageInput], batch_size: int = 64) -> List[Dict[str, Any]]:
+        """OCR a batch of cards, then run NER over all of their text in one nlp.pipe pass
+
+        A card that cannot be read comes back from failed_card, with an "error" message.
+        """
+        cards = [self._ocr_card_or_failure(image) for image in images]
+        return self.extract_card_fields(cards, batch_size)
+
+    def extract_card_fields(self, cards: List[Dict[str, Any]], batch_size: int = 64) -> List[Dict[str, Any]]:
+        """Fill in the fields of OCR'd cards with one NER (or regex) pass over the batch"""
+        # Fields read confidently from a known label keep their value; NER decides the rest
+        pending = [card for card in cards if card.pop("needs_ner")]
+        if pending and not self.use_ner:
+            for card in pending:
+                with _timed(card["timings"], "regex"):
+                    self._merge_fields(card, self.extract_regex_spans(card["raw_text"]))
+        elif pending:
+            start = time.perf_counter()
+            texts = (card["raw_text"] for card in pending)
+            # The regex fallbacks inside NER skip fields that are already resolved
+            skips = (self._confident_fields(card) for card in pending)
+            for card, spans in zip(pending, self.ner.process_texts_with_spans(texts, batch_size=batch_size, skips=skips)):
+                self._merge_fields(card, spans)
+            # The batch is one nlp.pipe pass, so each card is charged an equal share
+            ner_time = (time.perf_counter() - start) / len(pending)
+            for card in pending:
+                card["timings"]["ner"] = ner_time
+        
+        for card in cards:
+            card.pop("words", None)
+            card["extracted_fields"] = self.postprocess_fields(card["extracted_fields"])
+        return cards
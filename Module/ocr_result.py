@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+
+NUMERIC_COLUMNS = ("left", "top", "width", "height", "block_num", "par_num", "line_num")
+
+
+class OCRWords:
+    """Columnar word-level Tesseract output: one NumPy array per column plus a string table"""
+    __slots__ = ("conf", "left", "top", "width", "height", "block_num", "par_num", "line_num", "text", "lengths")
+
+    def __init__(self, conf: np.ndarray, columns: Dict[str, np.ndarray], text: Sequence[str]):
+        self.conf = conf
+        self.left = columns["left"]
+        self.top = columns["top"]
+        self.width = columns["width"]
+        self.height = columns["height"]
+        self.block_num = columns["block_num"]
+        self.par_num = columns["par_num"]
+        self.line_num = columns["line_num"]
+        self.text = list(text)
+        self.lengths = np.fromiter((len(t) for t in self.text), dtype=np.int32, count=len(self.text))
+
+    @classmethod
+    def from_tesseract(cls, ocr_data: Dict[str, List[Any]]) -> "OCRWords":
+        """Build from image_to_data DICT output (or its cached JSON form)"""
+        conf = np.asarray(ocr_data["conf"], dtype=np.float32)
+        columns = {name: np.asarray(ocr_data[name], dtype=np.int32) for name in NUMERIC_COLUMNS}
+        text = [str(t).strip() for t in ocr_data["text"]]
+        return cls(conf, columns, text)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def _select(self, mask: np.ndarray) -> "OCRWords":
+        columns = {name: getattr(self, name)[mask] for name in NUMERIC_COLUMNS}
+        text = [self.text[i] for i in np.flatnonzero(mask)]
+        return OCRWords(self.conf[mask], columns, text)
+
+    def filter(self, min_conf: float = 30) -> "OCRWords":
+        """Keep non-empty words above min_conf (compared on the integer part, like int(conf))"""
+        return self._select((np.trunc(self.conf) > min_conf) & (self.lengths > 0))
+
+    def joined_text(self) -> str:
+        return " ".join(self.text)
+
+    def weighted_confidence(self) -> float:
+        """Length-weighted mean confidence"""
+        total_length = int(self.lengths.sum())
+        if total_length == 0:
+            return 0.0
+        return float(np.dot(self.conf, self.lengths) / total_length)
+
+    def line_keys(self) -> np.ndarray:
+        """(block_num, par_num, line_num) rows identifying each word's line"""
+        return np.stack([self.block_num, self.par_num, self.line_num], axis=1)
+
+    def line_confidences(self) -> Dict[Tuple[int, int, int], float]:
+        """Length-weighted confidence per text line"""
+        if not len(self):
+            return {}
+        keys, inverse = np.unique(self.line_keys(), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        weighted = np.bincount(inverse, weights=self.conf * self.lengths)
+        lengths = np.bincount(inverse, weights=self.lengths)
+        confidences = np.divide(weighted, lengths, out=np.zeros_like(weighted), where=lengths > 0)
+        return {tuple(int(v) for v in key): float(c) for key, c in zip(keys, confidences)}
+
+    def char_offsets(self) -> np.ndarray:
+        """Start offset of each word in joined_text()"""
+        starts = np.zeros(len(self), dtype=np.int64)
+        if len(self) > 1:
+            np.cumsum(self.lengths[:-1] + 1, out=starts[1:])
+        return starts
+
+    def span_confidence(self, start: int, end: int) -> float:
+        """Length-weighted confidence of the words overlapping [start, end) in joined_text()"""
+        starts = self.char_offsets()
+        mask = (starts < end) & (starts + self.lengths > start)
+        lengths = self.lengths[mask]
+        if not lengths.sum():
+            return 0.0
+        return float(np.dot(self.conf[mask], lengths) / lengths.sum())
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+
+from .batch_processor import init_worker, process_encoded_chunk
+from .metrics import PipelineMetrics
+
+DEFAULT_SERVICE_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "unix_socket": None,
+    "workers": None,
+    "batch_size": 8,
+    "max_wait_ms": 10,
+    "queue_size": 256,
+    "max_body_bytes": 10 * 1024 * 1024,
+    "latency_window": 10000
+}
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at capacity"""
+
+
+class OCRService:
+    """Asyncio HTTP front end that micro-batches uploaded card images into a process pool"""
+
+    def __init__(self, config_path: str = "config.json", **overrides):
+        config = {}
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                config = json.load(f).get("service", {})
+        self.settings = {**DEFAULT_SERVICE_CONFIG, **config, **{k: v for k, v in overrides.items() if v is not None}}
+        self.settings["workers"] = max(1, self.settings["workers"] or os.cpu_count() or 1)
+        self.config_path = config_path
+        self.pool = None
+        self.queue = None
+        self.server = None
+        self.batchers = []
+        self.latencies = deque(maxlen=self.settings["latency_window"])
+        self.batch_sizes = deque(maxlen=self.settings["latency_window"])
+        self.counters = {"requests": 0, "completed": 0, "rejected": 0, "errors": 0, "pool_restarts": 0}
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        workers = self.settings["workers"]
+        self.pool = self._new_pool()
+        self.queue = asyncio.Queue(maxsize=self.settings["queue_size"])
+        # One batcher per worker: at most `workers` batches are in flight, so a
+        # saturated pool leaves requests in the bounded queue instead of piling up
+        self.batchers = [loop.create_task(self._batcher()) for _ in range(workers)]
+        if self.settings["unix_socket"]:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=self.settings["unix_socket"])
+            print(f"OCR service listening on unix:{self.settings['unix_socket']} ({workers} workers)")
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, self.settings["host"], self.settings["port"])
+            print(f"OCR service listening on http://{self.settings['host']}:{self.settings['port']} ({workers} workers)")
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Each worker loads the config and the spaCy model once, as in BatchProcessor
+        return ProcessPoolExecutor(self.settings["workers"], initializer=init_worker, initargs=(self.config_path,))
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        """Replace a pool a crashed worker left broken; batchers that saw the same pool share one restart"""
+        if self.pool is not broken:
+            return
+        print("OCR worker pool broke (a worker died); starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool = self._new_pool()
+        self.counters["pool_restarts"] += 1
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+        for task in self.batchers:
+            task.cancel()
+        await asyncio.gather(*self.batchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def submit(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Queue one encoded image and wait for its OCR result"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((image_bytes, future))
+        except asyncio.QueueFull:
+            raise QueueFullError()
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[bytes, asyncio.Future]]:
+        """Wait for one request, then collect more until batch_size or max_wait_ms"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.settings["max_wait_ms"] / 1000
+        while len(batch) < self.settings["batch_size"]:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.batch_sizes.append(len(batch))
+            pool = self.pool
+            try:
+                # One process_id_cards call per batch, so NER runs as a single nlp.pipe pass
+                results = await loop.run_in_executor(pool, process_encoded_chunk, [data for data, _ in batch])
+            except Exception as e:
+                # A dead worker breaks the whole executor; later requests need a fresh one
+                if isinstance(e, BrokenProcessPool):
+                    self._restart_pool(pool)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                # The client may have disconnected and cancelled its future
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            **self.counters,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.settings["queue_size"],
+            "workers": self.settings["workers"],
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0
+        }
+        if self.latencies:
+            stats["latency"] = PipelineMetrics.histogram(list(self.latencies))
+        return stats
+
+    async def _ocr(self, body: bytes) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        if not body:
+            return HTTPStatus.BAD_REQUEST, {"error": "empty request body; send the image bytes"}
+        start = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            result = await self.submit(body)
+        except QueueFullError:
+            self.counters["rejected"] += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "OCR queue is full, retry later"}
+        except Exception as e:
+            self.counters["errors"] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        if result is None:
+            self.counters["errors"] += 1
+            return HTTPStatus.BAD_REQUEST, {"error": "could not decode image"}
+        if "error" in result:
+            # The card failed in the worker without taking the rest of its batch down
+            self.counters["errors"] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": result["error"]}
+
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.counters["completed"] += 1
+        return HTTPStatus.OK, {
+            "extracted_fields": result["extracted_fields"],
+            "confidence": result["confidence"],
+            "field_confidence": result["field_confidence"],
+            "raw_text": result["raw_text"],
+            "cache_hit": result["cache_hit"],
+            "latency_ms": latency * 1000
+        }
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        path = path.split("?", 1)[0]
+        if path == "/ocr":
+            if method != "POST":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+            return await self._ocr(body)
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, self.stats()
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        return HTTPStatus.NOT_FOUND, {"error": f"no route for {method} {path}"}
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload).encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 with keep-alive: a request line, headers and a Content-Length body"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}, False)
+                    break
+                if length > self.settings["max_body_bytes"]:
+                    self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "image too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._route(method.upper(), path, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
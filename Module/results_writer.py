@@ -0,0 +1,70 @@
+import json
+import os
+from typing import Any, Dict, Set
+
+
+class ResultsWriter:
+    def __init__(self, path: str, resume: bool = False):
+        """Append-only JSON Lines writer that keeps only running totals in memory"""
+        self.path = path
+        self.completed: Set[str] = set()
+        self.total_cards = 0
+        self.confidence_sum = 0.0
+        self.accuracy_sum = 0.0
+
+        if resume and os.path.exists(path):
+            self._load_existing()
+            mode = "a"
+        else:
+            mode = "w"
+        self._file = open(path, mode, encoding="utf-8")
+
+    def _load_existing(self):
+        """Recover user_ids and totals from a previous, possibly interrupted, run"""
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                # A crash can leave a partial last line without its newline
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                self._update_stats(result)
+
+        # Drop any trailing partial record so new lines append cleanly
+        if valid_bytes < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+    def _update_stats(self, result: Dict[str, Any]):
+        self.completed.add(result["user_id"])
+        self.total_cards += 1
+        self.confidence_sum += result["confidence"]
+        self.accuracy_sum += result["accuracy"]
+
+    def write(self, result: Dict[str, Any]):
+        """Write one card result and flush it to disk"""
+        self._file.write(json.dumps(result) + "\n")
+        self._file.flush()
+        self._update_stats(result)
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics over every result in the file"""
+        total = self.total_cards
+        return {
+            "total_cards": total,
+            "avg_confidence": self.confidence_sum / total if total else 0.0,
+            "avg_accuracy": self.accuracy_sum / total if total else 0.0
+        }
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
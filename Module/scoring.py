@@ -0,0 +1,163 @@
+import string
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Optional C implementations of Levenshtein distance, fastest first
+try:
+    from rapidfuzz.distance import Levenshtein as _rapidfuzz_levenshtein
+    from rapidfuzz.process import cpdist as _rapidfuzz_cpdist
+    BACKEND = "rapidfuzz"
+except ImportError:
+    _rapidfuzz_levenshtein = None
+    _rapidfuzz_cpdist = None
+    try:
+        import Levenshtein as _python_levenshtein
+        BACKEND = "python-Levenshtein"
+    except ImportError:
+        _python_levenshtein = None
+        BACKEND = "python"
+
+# Lowercase, fold the common OCR confusions o->0, i->1, s->5 and drop every
+# non-alphanumeric ASCII character (punctuation, whitespace and control
+# characters) in a single str.translate pass. The later "OoIiSs" entries
+# override the plain uppercase->lowercase mapping.
+_NORMALIZE_TABLE = str.maketrans(
+    string.ascii_uppercase + "OoIiSs",
+    string.ascii_lowercase + "001155",
+    "".join(chr(c) for c in range(128) if not chr(c).isalnum())
+)
+
+
+def normalize_text(text) -> str:
+    """Normalize text for comparison by fixing common OCR mistakes and case"""
+    if not text:
+        return ""
+    text = str(text)
+    if text.isascii():
+        return text.translate(_NORMALIZE_TABLE)
+    # Non-ASCII input: lower() can change lengths and isalnum() covers more than ASCII
+    text = text.lower().replace('o', '0').replace('i', '1').replace('s', '5')
+    return ''.join(c for c in text if c.isalnum())
+
+
+def _python_distance(a: str, b: str) -> int:
+    """Levenshtein distance with common prefix/suffix trimming and a single DP row"""
+    if a == b:
+        return 0
+    # Trim shared prefix and suffix, which is most of the string for good OCR
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def levenshtein_distance(a: str, b: str) -> int:
+    if _rapidfuzz_levenshtein is not None:
+        return _rapidfuzz_levenshtein.distance(a, b)
+    if _python_levenshtein is not None:
+        return _python_levenshtein.distance(a, b)
+    return _python_distance(a, b)
+
+
+def levenshtein_similarity(original: str, extracted: str) -> float:
+    """1 - character error rate, normalized by the longer string"""
+    if not original or not extracted:
+        return 0.0
+    return 1.0 - levenshtein_distance(original, extracted) / max(len(original), len(extracted))
+
+
+def positional_similarity(original: str, extracted: str) -> float:
+    """Position-by-position character matches; the scorer main.py used before edit distance"""
+    if not original or not extracted:
+        return 0.0
+    matches = sum(1 for a, b in zip(original, extracted) if a == b)
+    return matches / max(len(original), len(extracted))
+
+
+def precision_recall_f1(counts: Dict[str, float]) -> Dict[str, float]:
+    """Precision, recall and F1 from tp/fp/fn counts"""
+    tp, fp, fn = counts["tp"], counts["fp"], counts["fn"]
+    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
+    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
+    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+SCORERS: Dict[str, Callable[[str, str], float]] = {
+    "levenshtein": levenshtein_similarity,
+    "positional": positional_similarity
+}
+
+
+def score_fields(original_fields: Dict[str, str], extracted_fields: Dict[str, str],
+                 scorer: str = "levenshtein") -> Dict[str, float]:
+    """Per-field accuracy for one card; fields missing from the OCR output score 0"""
+    score = SCORERS[scorer]
+    return {
+        field: score(normalize_text(value), normalize_text(extracted_fields[field])) if field in extracted_fields else 0.0
+        for field, value in original_fields.items()
+    }
+
+
+def score_cards(cards: Iterable[Tuple[Dict[str, str], Dict[str, str]]],
+                scorer: str = "levenshtein") -> List[Dict[str, float]]:
+    """score_fields for many (original_fields, extracted_fields) pairs in one pass"""
+    normalized = {}
+
+    def normalize(value) -> str:
+        # Field values repeat a lot across cards (colleges, branches); normalize each once
+        key = str(value)
+        if key not in normalized:
+            normalized[key] = normalize_text(key)
+        return normalized[key]
+
+    # Flatten every comparable field pair across all cards
+    results = []
+    slots = []
+    originals = []
+    extracteds = []
+    for original_fields, extracted_fields in cards:
+        accuracy = {}
+        for field, value in original_fields.items():
+            accuracy[field] = 0.0
+            if field in extracted_fields:
+                original, extracted = normalize(value), normalize(extracted_fields[field])
+                if original and extracted:
+                    slots.append((accuracy, field))
+                    originals.append(original)
+                    extracteds.append(extracted)
+        results.append(accuracy)
+
+    if scorer == "levenshtein" and _rapidfuzz_cpdist is not None and slots:
+        # One vectorized C call for all distances; normalized here so scores match levenshtein_similarity exactly
+        distances = _rapidfuzz_cpdist(originals, extracteds, scorer=_rapidfuzz_levenshtein.distance).tolist()
+        scores = [
+            1.0 - distance / max(len(original), len(extracted))
+            for distance, original, extracted in zip(distances, originals, extracteds)
+        ]
+    else:
+        score = SCORERS[scorer]
+        scores = [score(original, extracted) for original, extracted in zip(originals, extracteds)]
+
+    for (accuracy, field), value in zip(slots, scores):
+        accuracy[field] = float(value)
+    return results
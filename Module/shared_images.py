@@ -0,0 +1,98 @@
+import mmap
+import os
+import tempfile
+from collections import deque
+from multiprocessing import shared_memory
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class SharedImage(NamedTuple):
+    """Handle to an image stored in a SharedImageRing slot; a few bytes to pickle"""
+    slot: int
+    shape: Tuple[int, ...]
+    dtype: str = "uint8"
+
+
+class SharedImageRing:
+    def __init__(self, slots: int, slot_bytes: int, directory: str = None, name: str = None):
+        """Fixed number of equally sized image slots in one shared block of memory
+
+        The creating process owns the block and hands out free slots; worker
+        processes attach by name and read or write slots in place. By default the
+        block is POSIX shared memory; with a directory it is a memory-mapped file
+        there instead (for hosts with a small /dev/shm).
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        self._shm = None
+        self._mmap = None
+        self.path = None
+        size = slots * slot_bytes
+
+        if directory is not None or (name is not None and os.path.isfile(name)):
+            if self.owner:
+                fd, self.path = tempfile.mkstemp(prefix="image_ring_", dir=directory)
+                os.ftruncate(fd, size)
+            else:
+                self.path = name
+                fd = os.open(name, os.O_RDWR)
+            try:
+                self._mmap = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            self.name = self.path
+            self.buffer = memoryview(self._mmap)
+        else:
+            if self.owner:
+                self._shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                # Pool workers share the owner's resource tracker, so attaching
+                # does not add a second registration and only the owner unlinks
+                self._shm = shared_memory.SharedMemory(name=name)
+            self.name = self._shm.name
+            self.buffer = self._shm.buf
+
+        # Free slots are tracked by the owner only
+        self._free = deque(range(slots)) if self.owner else deque()
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> int:
+        return self._free.popleft()
+
+    def release(self, slot: int):
+        self._free.append(slot)
+
+    def view(self, image: SharedImage) -> np.ndarray:
+        """Array over the slot's memory; valid until the slot is released"""
+        count = int(np.prod(image.shape))
+        return np.frombuffer(self.buffer, dtype=image.dtype, count=count, offset=image.slot * self.slot_bytes).reshape(image.shape)
+
+    def allocate(self, slot: int, shape: Tuple[int, ...], dtype: str = "uint8") -> Tuple[SharedImage, np.ndarray]:
+        """Handle and writable array for an image built in place in a slot, or (None, None) if it does not fit"""
+        if int(np.prod(shape)) * np.dtype(dtype).itemsize > self.slot_bytes:
+            return None, None
+        handle = SharedImage(slot, tuple(shape), dtype)
+        return handle, self.view(handle)
+
+    def close(self):
+        self.buffer.release()
+        if self._shm is not None:
+            self._shm.close()
+            if self.owner:
+                self._shm.unlink()
+        if self._mmap is not None:
+            self._mmap.close()
+            if self.owner:
+                os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
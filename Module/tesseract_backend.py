@@ -0,0 +1,174 @@
+import os
+import re
+import shlex
+import subprocess
+import cv2
+import numpy as np
+from PIL import Image
+from typing import Any, Dict, List
+
+# Columns of pytesseract's image_to_data DICT output, which every backend returns
+OCR_DATA_KEYS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text"
+)
+
+
+class PytesseractBackend:
+    """Runs a fresh tesseract process per image through pytesseract"""
+    name = "pytesseract"
+
+    def __init__(self, tesseract_config: Dict[str, Any]):
+        # Imported on construction, like tesserocr, to keep module import cheap
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.config_string = build_config_string(tesseract_config)
+        self.lang = tesseract_config["lang"]
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """Tesseract version and traineddata fingerprint, looked up once"""
+        if self._version is None:
+            # --list-langs names the tessdata directory the binary actually uses
+            output = subprocess.run(
+                [self._pytesseract.pytesseract.tesseract_cmd, "--list-langs"],
+                capture_output=True, text=True
+            ).stdout
+            match = re.search(r'"(.*?)"', output)
+            tessdata = match.group(1) if match else ""
+            self._version = f"{self._pytesseract.get_tesseract_version()} {traineddata_fingerprint(tessdata, self.lang)}"
+        return self._version
+
+    def close(self):
+        # Nothing held between calls; each image runs its own tesseract process
+        pass
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, List]:
+        return self._pytesseract.image_to_data(
+            Image.fromarray(image),
+            config=self.config_string,
+            output_type=self._pytesseract.Output.DICT
+        )
+
+
+class TesserocrBackend:
+    """Keeps one Tesseract engine loaded for the life of the process"""
+    name = "tesserocr"
+
+    def __init__(self, tesseract_config: Dict[str, Any]):
+        # Imported here so the optional dependency is only needed when selected
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.api = tesserocr.PyTessBaseAPI(
+            lang=tesseract_config["lang"],
+            psm=int(tesseract_config["psm"]),
+            oem=int(tesseract_config["oem"])
+        )
+        self.dpi = None
+        self._apply_config_params(tesseract_config.get("config_params", ""))
+        self.version = f"{tesserocr.tesseract_version()} {traineddata_fingerprint(self.api.GetDatapath(), tesseract_config['lang'])}"
+
+    def _apply_config_params(self, config_params: str):
+        """Translate tesseract CLI style parameters into API calls"""
+        args = shlex.split(config_params)
+        i = 0
+        while i < len(args):
+            if args[i] == "--dpi" and i + 1 < len(args):
+                self.dpi = int(args[i + 1])
+                i += 2
+            elif args[i] == "-c" and i + 1 < len(args):
+                key, _, value = args[i + 1].partition("=")
+                self.api.SetVariable(key, value)
+                i += 2
+            else:
+                i += 1
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, List]:
+        RIL = self._tesserocr.RIL
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        # Hand the raw pixel buffer straight to the engine, no PNG encode/decode
+        self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        if self.dpi:
+            self.api.SetSourceResolution(self.dpi)
+        self.api.Recognize()
+
+        data = {key: [] for key in OCR_DATA_KEYS}
+        iterator = self.api.GetIterator()
+        if iterator is None:
+            return data
+
+        block_num = par_num = line_num = word_num = 0
+        for word in self._tesserocr.iterate_level(iterator, RIL.WORD):
+            if word.IsAtBeginningOf(RIL.BLOCK):
+                block_num += 1
+                par_num = 0
+            if word.IsAtBeginningOf(RIL.PARA):
+                par_num += 1
+                line_num = 0
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line_num += 1
+                word_num = 0
+            word_num += 1
+
+            box = word.BoundingBox(RIL.WORD)
+            if box is None:
+                continue
+            left, top, right, bottom = box
+            data["level"].append(5)
+            data["page_num"].append(1)
+            data["block_num"].append(block_num)
+            data["par_num"].append(par_num)
+            data["line_num"].append(line_num)
+            data["word_num"].append(word_num)
+            data["left"].append(left)
+            data["top"].append(top)
+            data["width"].append(right - left)
+            data["height"].append(bottom - top)
+            data["conf"].append(word.Confidence(RIL.WORD))
+            data["text"].append(word.GetUTF8Text(RIL.WORD) or "")
+        return data
+
+    def close(self):
+        self.api.End()
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend
+}
+
+
+def traineddata_fingerprint(tessdata_dir: str, lang: str) -> str:
+    """Size and mtime of each language's traineddata file, so a retrained or upgraded model is noticed"""
+    parts = []
+    for name in lang.split("+"):
+        try:
+            stat = os.stat(os.path.join(tessdata_dir, f"{name}.traineddata"))
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{name}:?")
+    return ",".join(parts)
+
+
+def build_config_string(tesseract_config: Dict[str, Any]) -> str:
+    return f'-l {tesseract_config["lang"]} --oem {tesseract_config["oem"]} --psm {tesseract_config["psm"]} {tesseract_config["config_params"]}'
+
+
+def create_backend(tesseract_config: Dict[str, Any]):
+    """Build the configured backend, falling back to pytesseract if it is unavailable"""
+    name = tesseract_config.get("backend", PytesseractBackend.name)
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown tesseract backend: {name}")
+    if backend_class is not PytesseractBackend:
+        try:
+            return backend_class(tesseract_config)
+        except (ImportError, RuntimeError) as e:
+            print(f"Warning: tesseract backend '{name}' unavailable ({e}), falling back to pytesseract")
+    return PytesseractBackend(tesseract_config)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+from tqdm import tqdm
+
+# A job builds one target from its sources with one command
+Job = Tuple[str, List[str], List[str]]
+
+
+class TrainingDataBuilder:
+    def __init__(self, image_dir: str, json_dir: str, box_dir: str, gt_dir: str, lstmf_dir: str,
+                 workers: int = None, manifest_path: str = ".training_manifest.json"):
+        """Incremental builder for Tesseract .gt.txt, .box and .lstmf training files"""
+        self.image_dir = image_dir
+        self.json_dir = json_dir
+        self.box_dir = box_dir
+        self.gt_dir = gt_dir
+        self.lstmf_dir = lstmf_dir
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.manifest_path = manifest_path
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict[str, str]]:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _signature(sources: List[str], command: List[str]) -> str:
+        """Hash of the source contents and the command that turns them into the target"""
+        digest = hashlib.sha256()
+        for source in sources:
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+            digest.update(b"\0")
+        digest.update(" ".join(command).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, target: str, sources: List[str], command: List[str]) -> bool:
+        """make-style check: mtimes first, content hash when they disagree"""
+        entry = self.manifest.get(target)
+        if entry is None or not os.path.exists(target) or entry["command"] != " ".join(command):
+            return False
+        target_mtime = os.path.getmtime(target)
+        if all(os.path.getmtime(source) <= target_mtime for source in sources):
+            return True
+        # A newer mtime alone (touch, checkout) does not mean the content changed
+        return entry["hash"] == self._signature(sources, command)
+
+    def _record(self, target: str, sources: List[str], command: List[str]):
+        self.manifest[target] = {"hash": self._signature(sources, command), "command": " ".join(command)}
+
+    def _list(self, directory: str, extension: str) -> List[str]:
+        return sorted(f for f in os.listdir(directory) if f.endswith(extension))
+
+    def build_gt(self) -> List[Tuple[str, str]]:
+        """Write <base>.gt.txt for every JSON file whose content changed"""
+        os.makedirs(self.gt_dir, exist_ok=True)
+        filenames = self._list(self.json_dir, ".json")
+        failures = []
+        written = 0
+        for filename in filenames:
+            json_path = os.path.join(self.json_dir, filename)
+            base = os.path.splitext(filename)[0]
+            gt_path = os.path.join(self.gt_dir, f"{base}.gt.txt")
+            if self._is_up_to_date(gt_path, [json_path], ["gt"]):
+                continue
+
+            try:
+                with open(json_path, "r") as f:
+                    data = json.load(f)
+            except ValueError as e:
+                failures.append((gt_path, f"invalid JSON in {json_path}: {e}"))
+                continue
+            user_id = data.get("user_id", "unknown_id")
+            fields = data.get("extracted_fields", {})
+            lines = [f"ID Card - {user_id}"]
+            for key, value in fields.items():
+                lines.append(f"{key.capitalize().replace('_', ' ')}: {value}")
+
+            with open(gt_path, "w") as f:
+                f.write("\n".join(lines))
+            self._record(gt_path, [json_path], ["gt"])
+            written += 1
+
+        self._save_manifest()
+        for target, error in failures:
+            print(f"Failed: {target}: {error}")
+        print(f"gt: {written} written, {len(filenames) - written - len(failures)} up to date, {len(failures)} failed")
+        return failures
+
+    def box_jobs(self) -> List[Job]:
+        jobs = []
+        for filename in self._list(self.image_dir, ".png"):
+            base = os.path.splitext(filename)[0]
+            image_path = os.path.join(self.image_dir, filename)
+            command = ["tesseract", image_path, os.path.join(self.box_dir, base), "batch.nochop", "makebox"]
+            jobs.append((os.path.join(self.box_dir, f"{base}.box"), [image_path], command))
+        return jobs
+
+    def lstmf_jobs(self) -> List[Job]:
+        jobs = []
+        for filename in self._list(self.image_dir, ".png"):
+            base = os.path.splitext(filename)[0]
+            image_path = os.path.join(self.image_dir, filename)
+            box_path = os.path.join(self.box_dir, f"{base}.box")
+            gt_path = os.path.join(self.gt_dir, f"{base}.gt.txt")
+            if not (os.path.exists(box_path) and os.path.exists(gt_path)):
+                print(f"Skipping {base}: missing .box or .gt.txt")
+                continue
+            command = ["tesseract", image_path, os.path.join(self.lstmf_dir, base), "--psm", "7", "lstm.train"]
+            jobs.append((os.path.join(self.lstmf_dir, f"{base}.lstmf"), [image_path, box_path, gt_path], command))
+        return jobs
+
+    def run_jobs(self, jobs: List[Job], desc: str) -> List[Tuple[str, str]]:
+        """Run stale jobs in a bounded worker pool; returns (target, error) for failures"""
+        stale = [job for job in jobs if not self._is_up_to_date(*job)]
+        print(f"{desc}: {len(stale)} to build, {len(jobs) - len(stale)} up to date")
+        failures = []
+        if not stale:
+            return failures
+
+        # tesseract runs as a subprocess, so threads are enough to keep every core busy
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(subprocess.run, command, capture_output=True, text=True): (target, sources, command)
+                for target, sources, command in stale
+            }
+            with tqdm(total=len(futures), desc=desc) as progress:
+                for future in as_completed(futures):
+                    target, sources, command = futures[future]
+                    try:
+                        result = future.result()
+                        if result.returncode != 0 or not os.path.exists(target):
+                            failures.append((target, result.stderr.strip() or f"exit code {result.returncode}"))
+                        else:
+                            self._record(target, sources, command)
+                    except OSError as e:
+                        failures.append((target, str(e)))
+                    progress.update(1)
+
+        self._save_manifest()
+        for target, error in failures:
+            print(f"Failed: {target}: {error}")
+        print(f"{desc}: {len(stale) - len(failures)} built, {len(failures)} failed")
+        return failures
+
+    def build_boxes(self) -> List[Tuple[str, str]]:
+        os.makedirs(self.box_dir, exist_ok=True)
+        return self.run_jobs(self.box_jobs(), "makebox")
+
+    def build_lstmf(self) -> List[Tuple[str, str]]:
+        os.makedirs(self.lstmf_dir, exist_ok=True)
+        return self.run_jobs(self.lstmf_jobs(), "lstm.train")
+
+    def build_all(self) -> List[Tuple[str, str]]:
+        """gt and box files first, since every lstmf job depends on both"""
+        failures = self.build_gt()
+        failures += self.build_boxes()
+        return failures + self.build_lstmf()
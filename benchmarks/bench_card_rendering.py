@@ -0,0 +1,53 @@
+"""Compare per-card rendering cost of the cached CardRenderer against fresh setup per card.
+
+Run from the repository root:
+    python -m benchmarks.bench_card_rendering --cards 2000
+"""
+import argparse
+import json
+import os
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from Module.id_card import FONT_PATH, FONT_SIZE, CardRenderer
+
+
+def render_uncached(data):
+    # The pre-renderer code path: font load and canvas allocation for every card
+    img = Image.new("RGB", (600, 300), color="white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.truetype(FONT_PATH, FONT_SIZE)
+    y = 20
+    draw.text((20, y), f"ID Card - {data['user_id']}", font=font, fill="black")
+    y += 40
+    for key, value in data["extracted_fields"].items():
+        draw.text((20, y), f"{key.capitalize().replace('_', ' ')}: {value}", font=font, fill="black")
+        y += 35
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="json_data", help="Directory of card JSON files")
+    parser.add_argument("--cards", type=int, default=1000, help="Number of cards to render per variant")
+    args = parser.parse_args()
+
+    samples = []
+    for filename in sorted(os.listdir(args.input)):
+        if filename.endswith(".json"):
+            with open(os.path.join(args.input, filename), "r") as f:
+                samples.append(json.load(f))
+    cards = [samples[i % len(samples)] for i in range(args.cards)]
+
+    renderer = CardRenderer()
+    for name, render in (("uncached", render_uncached), ("CardRenderer", renderer.render)):
+        start = time.perf_counter()
+        for data in cards:
+            render(data)
+        elapsed = time.perf_counter() - start
+        print(f"{name:12s} {len(cards) / elapsed:8.1f} cards/sec")
+
+
+if __name__ == "__main__":
+    main()
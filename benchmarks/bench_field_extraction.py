@@ -0,0 +1,114 @@
+"""Micro-benchmark the shared field extractor against the old per-field re.search loop.
+
+Before timing, checks that a card's fields come out the same from the fast
+labelled-pattern path and from the path that merges NER/fallback values.
+
+Run from the repository root:
+    python -m benchmarks.bench_field_extraction --repeat 200
+"""
+import argparse
+import json
+import re
+import timeit
+
+from Module.field_extractor import SECTION_FLAGS, get_extractor
+from Module.ocr_processor import OCRProcessor
+
+SECTION = "ner_fallback_patterns"
+# A card as clean_text leaves it, with punctuation the OCR artifact cleanup removes
+SAMPLE_CARD_TEXT = ("Name: Ravi Kumar College: Reddy Institute of Science, Arts & Commerce "
+                    "Roll number: ABCI234S Branch: Computer Science Valid upto: 2O26")
+
+
+def load_texts(results_path):
+    """OCR text from a previous run; works with both the .json and .jsonl result formats"""
+    with open(results_path, 'r') as f:
+        if results_path.endswith(".jsonl"):
+            results = [json.loads(line) for line in f]
+        else:
+            results = json.load(f)["results"]
+    return [r["raw_text"] for r in results]
+
+
+def path_mismatches(texts):
+    """(field, fast value, merged value) for every field both paths resolve to different values"""
+    import spacy
+
+    processor = OCRProcessor()
+    processor.use_ner = True
+    # No entity recognizer: every merged value comes from NER's fallback spans and their
+    # cleanup, so a difference points at the cleanup rather than at the trained model
+    processor.ner._nlp = spacy.blank("en")
+    mismatches = []
+    for text in texts:
+        fast, merged = processor.text_card(text, 0.0), processor.text_card(text, 0.0)
+        fast["needs_ner"] = False
+        merged["needs_ner"] = True
+        fast, merged = (card["extracted_fields"] for card in processor.extract_card_fields([fast, merged]))
+        mismatches.extend((field, fast[field], merged[field]) for field in fast.keys() & merged.keys()
+                          if fast[field] != merged[field])
+    processor.close()
+    return mismatches
+
+
+def check_paths_agree(texts):
+    """Fail unless the sample card reads the same on both paths; report differences on real OCR text"""
+    mismatches = path_mismatches([SAMPLE_CARD_TEXT])
+    if mismatches:
+        raise SystemExit("Fast and merged field values differ on the sample card:\n" + "\n".join(
+            f"  {field}: {fast!r} != {merged!r}" for field, fast, merged in mismatches))
+    # OCR noise can legitimately make the labelled and fallback patterns match different spans
+    mismatches = path_mismatches(texts)
+    print(f"Fast and merged fields differ {len(mismatches)} times over {len(texts)} texts")
+    for field, fast, merged in mismatches:
+        print(f"  {field}: {fast!r} != {merged!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", default="ocr_results/ocr_results.json", help="Results file with raw_text")
+    parser.add_argument("--repeat", type=int, default=100, help="Passes over all texts per variant")
+    args = parser.parse_args()
+
+    texts = load_texts(args.results)
+    check_paths_agree(texts)
+    extractor = get_extractor(SECTION)
+    flags = SECTION_FLAGS.get(SECTION, 0)
+    raw_patterns = {field: pattern.pattern for field, (pattern, _) in extractor.patterns.items()}
+
+    def per_call_search():
+        # The pre-engine code path: raw strings looked up in re's cache on every call
+        for text in texts:
+            fields = {}
+            for field, pattern in raw_patterns.items():
+                match = re.search(pattern, text, flags)
+                if match:
+                    fields[field] = match.group("value").strip()
+
+    def engine():
+        for text in texts:
+            extractor.extract(text)
+
+    # One alternation of zero-width lookaheads, kept for reference: it loses re's
+    # literal-prefix scan, so it is slower than separate precompiled searches
+    combined = re.compile(
+        "|".join(f"(?=(?P<f{i}>{p.replace('?P<value>', '')}))" for i, p in enumerate(raw_patterns.values())),
+        flags
+    )
+
+    def combined_alternation():
+        for text in texts:
+            for _ in combined.finditer(text):
+                pass
+
+    baseline = None
+    for name, fn in (("per-call re.search", per_call_search), ("FieldExtractor", engine),
+                     ("combined alternation", combined_alternation)):
+        seconds = timeit.timeit(fn, number=args.repeat)
+        per_text = seconds / (args.repeat * len(texts)) * 1e6
+        baseline = baseline or per_text
+        print(f"{name:22s} {per_text:8.2f} us/text  ({baseline / per_text:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Benchmark the render -> OCR -> NER pipeline on a synthetic corpus and compare to a baseline.
+
+Cards are generated from the json_data schema with a fixed seed, optionally
+degraded with noise, blur and rotation, and run through OCRProcessor with the
+OCR cache disabled. Each corpus size runs in a fresh process, so its peak RSS
+is its own. Stage timings, end-to-end throughput, field accuracy and peak RSS
+are written per corpus size.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --sizes 10 50 --noise 8 --blur 3 --rotation 2
+    python -m benchmarks.bench_pipeline --sizes 10 50 --save-baseline
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from Module.id_card import IdCard
+from Module.metrics import PipelineMetrics
+from Module.ocr_processor import OCRProcessor
+from Module.scoring import score_cards
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+
+def field_pools(json_dir):
+    """Value pools for each field, collected from the real card JSON"""
+    pools = {"first_names": set(), "last_names": set(), "college": set(), "branch": set(), "valid_upto": set()}
+    for path in glob.glob(os.path.join(json_dir, "*.json")):
+        with open(path, 'r') as f:
+            fields = json.load(f)["extracted_fields"]
+        # Some cards deliberately omit fields; take whatever each one has
+        if fields.get("name"):
+            first, _, last = fields["name"].partition(" ")
+            pools["first_names"].add(first)
+            pools["last_names"].add(last or first)
+        for field in ("college", "branch", "valid_upto"):
+            if fields.get(field):
+                pools[field].add(str(fields[field]))
+    # Sorted so the same seed gives the same corpus regardless of directory order
+    return {field: sorted(values) for field, values in pools.items()}
+
+
+def synthetic_cards(count, pools, seed):
+    rng = random.Random(seed)
+    cards = []
+    for i in range(count):
+        college = rng.choice(pools["college"])
+        prefix = "".join(c for c in college.upper() if c.isalpha())[:3].ljust(3, "X")
+        cards.append({
+            "user_id": f"bench_{i:05d}",
+            "extracted_fields": {
+                "name": f"{rng.choice(pools['first_names'])} {rng.choice(pools['last_names'])}",
+                "college": college,
+                "roll_number": f"{rng.randint(18, 25)}{prefix}{rng.randint(0, 9999):04d}",
+                "branch": rng.choice(pools["branch"]),
+                "valid_upto": rng.choice(pools["valid_upto"])
+            }
+        })
+    return cards
+
+
+def degrade(image, rng, noise, blur, rotation):
+    """Rotate by up to +/- rotation degrees, Gaussian-blur with a blur-pixel kernel, then add noise of sigma noise"""
+    img = np.asarray(image.convert("RGB"))[:, :, ::-1].copy()
+    if rotation:
+        angle = rng.uniform(-rotation, rotation)
+        h, w = img.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (w, h), borderValue=(255, 255, 255))
+    if blur:
+        kernel = blur | 1
+        img = cv2.GaussianBlur(img, (kernel, kernel), 0)
+    if noise:
+        img = np.clip(img + rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def tesseract_version():
+    try:
+        output = subprocess.run(["tesseract", "--version"], capture_output=True, text=True).stdout
+        return output.splitlines()[0] if output else "unknown"
+    except OSError:
+        return "not found"
+
+
+def run_size(processor, cards, args):
+    rng = np.random.default_rng(args.seed)
+    metrics = PipelineMetrics()
+
+    images = []
+    for card in cards:
+        with metrics.timer("render"):
+            image = IdCard.render_id_card(card)
+        with metrics.timer("degrade"):
+            images.append(degrade(image, rng, args.noise, args.blur, args.rotation))
+
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(images), args.batch_size):
+        results.extend(processor.process_id_cards(images[i:i + args.batch_size], batch_size=args.batch_size))
+    elapsed = time.perf_counter() - start
+    for result in results:
+        metrics.record_card(result)
+
+    accuracy = score_cards((card["extracted_fields"], result["extracted_fields"]) for card, result in zip(cards, results))
+    finished = metrics.finish()
+    stages = finished["stages"]
+    return {
+        "cards": len(cards),
+        "throughput_cards_per_s": len(cards) / elapsed if elapsed > 0 else 0.0,
+        "mean_accuracy": float(np.mean([np.mean(list(a.values())) for a in accuracy])),
+        "peak_rss_mb": peak_rss_mb(),
+        "stage_mean_ms": {stage: h["mean_ms"] for stage, h in stages.items()},
+        "card_p95_ms": stages["card"]["p95_ms"],
+        # Cards resolved per cascade tier; empty when the cascade is disabled
+        "tiers": {name: count for name, count in finished["counters"].items() if name.startswith("tier_") or name == "unresolved"}
+    }
+
+
+def run_size_in_process(args, size):
+    """Build the processor and corpus, then run_size, all inside a spawned worker
+
+    ru_maxrss is a high-water mark for the whole process, so sizes sharing one
+    process would each report the largest peak so far.
+    """
+    processor = OCRProcessor(args.config)
+    # Every synthetic card is new, but repeated runs would otherwise be served from the cache
+    processor.cache = None
+    return run_size(processor, synthetic_cards(size, field_pools(args.json_dir), args.seed), args)
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Regressions beyond threshold (fractional) for every metric present in both runs"""
+    regressions = []
+    for size, run in current["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        checks = [("throughput_cards_per_s", run["throughput_cards_per_s"], base["throughput_cards_per_s"], True),
+                  ("mean_accuracy", run["mean_accuracy"], base["mean_accuracy"], True),
+                  ("peak_rss_mb", run["peak_rss_mb"], base["peak_rss_mb"], False),
+                  ("card_p95_ms", run["card_p95_ms"], base["card_p95_ms"], False)]
+        checks += [(f"stage {stage} mean_ms", value, base["stage_mean_ms"][stage], False)
+                   for stage, value in run["stage_mean_ms"].items() if stage in base["stage_mean_ms"]]
+        for name, value, reference, higher_is_better in checks:
+            if reference <= 0:
+                continue
+            # Sub-millisecond stages jitter by large fractions without meaning anything
+            if name.endswith("_ms") and abs(value - reference) < min_delta_ms:
+                continue
+            change = (value - reference) / reference
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"size {size}: {name} {reference:.3f} -> {value:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50], help="Corpus sizes to run")
+    parser.add_argument("--json-dir", default=os.getenv("INPUT_DIR", "json_data"), help="Card JSON used for field value pools")
+    parser.add_argument("--config", default="config.json", help="OCRProcessor config")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for card values and degradations")
+    parser.add_argument("--noise", type=float, default=0.0, help="Gaussian noise sigma in gray levels")
+    parser.add_argument("--blur", type=int, default=0, help="Gaussian blur kernel size in pixels")
+    parser.add_argument("--rotation", type=float, default=0.0, help="Maximum rotation in degrees")
+    parser.add_argument("--batch-size", type=int, default=16, help="Cards per process_id_cards call")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed fractional regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore timing changes smaller than this")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    report = {
+        "settings": {name: getattr(args, name) for name in ("seed", "noise", "blur", "rotation", "batch_size", "config")},
+        "environment": {"python": sys.version.split()[0], "tesseract": tesseract_version(), "cpus": os.cpu_count()},
+        "sizes": {}
+    }
+    # Spawned rather than forked, so no size starts with memory touched by an earlier one
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            run = pool.apply(run_size_in_process, (args, size))
+        report["sizes"][str(size)] = run
+        stages = "  ".join(f"{stage} {ms:.1f}" for stage, ms in sorted(run["stage_mean_ms"].items(), key=lambda item: -item[1]))
+        print(f"{size:>6} cards: {run['throughput_cards_per_s']:.2f} cards/sec, accuracy {run['mean_accuracy']:.2%}, "
+              f"peak RSS {run['peak_rss_mb']:.0f} MB, p95 {run['card_p95_ms']:.0f} ms")
+        print(f"        mean ms per card: {stages}")
+        if run["tiers"]:
+            print(f"        cascade: {'  '.join(f'{name} {count}' for name, count in run['tiers'].items())}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != report["settings"]:
+        print("Warning: baseline was recorded with different settings; comparison may not be meaningful")
+    regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
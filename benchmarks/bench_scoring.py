@@ -0,0 +1,76 @@
+"""Micro-benchmark field scoring: the old positional loop against the scoring module.
+
+Run from the repository root:
+    python -m benchmarks.bench_scoring --results ocr_results/ocr_results.jsonl --repeat 50
+"""
+import argparse
+import json
+import timeit
+
+from Module import scoring
+from Module.scoring import score_cards, score_fields
+
+
+def load_cards(results_path):
+    """(original_fields, extracted_fields) pairs from a previous run, .json or .jsonl"""
+    with open(results_path, 'r') as f:
+        if results_path.endswith(".jsonl"):
+            results = [json.loads(line) for line in f]
+        else:
+            results = json.load(f)["results"]
+    return [(r["original_fields"], r["extracted_fields"]) for r in results]
+
+
+def old_normalize_text(text):
+    if not text:
+        return ""
+    text = str(text).lower()
+    text = text.replace('o', '0').replace('i', '1').replace('s', '5')
+    return ''.join(c for c in text if c.isalnum())
+
+
+def old_validate(original_fields, extracted_fields):
+    # The scoring loop main.validate_card used before the scoring module
+    field_accuracy = {}
+    for field in original_fields:
+        if field in extracted_fields:
+            original_value = old_normalize_text(original_fields[field])
+            extracted_value = old_normalize_text(extracted_fields[field])
+            if original_value and extracted_value:
+                if len(original_value) > len(extracted_value):
+                    accuracy = sum(1 for i in range(len(extracted_value)) if i < len(original_value) and extracted_value[i] == original_value[i]) / len(original_value)
+                else:
+                    accuracy = sum(1 for i in range(len(original_value)) if i < len(extracted_value) and original_value[i] == extracted_value[i]) / len(extracted_value)
+            else:
+                accuracy = 0.0
+            field_accuracy[field] = accuracy
+        else:
+            field_accuracy[field] = 0.0
+    return field_accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", default="ocr_results/ocr_results.json", help="Results file with original and extracted fields")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over all cards per variant")
+    args = parser.parse_args()
+
+    cards = load_cards(args.results)
+    print(f"Levenshtein backend: {scoring.BACKEND}")
+
+    variants = (
+        ("old positional loop", lambda: [old_validate(o, e) for o, e in cards]),
+        ("score_fields positional", lambda: [score_fields(o, e, "positional") for o, e in cards]),
+        ("score_fields levenshtein", lambda: [score_fields(o, e) for o, e in cards]),
+        ("score_cards levenshtein", lambda: score_cards(cards))
+    )
+    baseline = None
+    for name, fn in variants:
+        seconds = timeit.timeit(fn, number=args.repeat)
+        per_card = seconds / (args.repeat * len(cards)) * 1e6
+        baseline = baseline or per_card
+        print(f"{name:26s} {per_card:8.2f} us/card  ({baseline / per_card:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure interpreter startup cost: module import time and OCRProcessor construction.
+
+Each measurement runs in a fresh interpreter. Import cost comes from
+`python -X importtime`; the heaviest top-level packages are listed.
+Point --repo at another checkout (e.g. `git worktree add /tmp/before <ref>`)
+to compare before and after a change.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --repo /tmp/before
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Printed by the child so the parent can read the wall times
+CONSTRUCT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+from Module.ocr_processor import OCRProcessor
+imported = time.perf_counter()
+processor = OCRProcessor({config!r})
+constructed = time.perf_counter()
+processor.{first_use}
+used = time.perf_counter()
+print(json.dumps({{"import": imported - start, "construct": constructed - imported, "first_use": used - constructed,
+                   "spacy_loaded": "spacy" in __import__("sys").modules}}))
+"""
+
+
+def import_times(repo, module):
+    """Cumulative microseconds per top-level package from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=repo, capture_output=True, text=True, check=True)
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        total += int(head.split(":")[1])
+        # Nesting is shown as two extra spaces per level; keep what the module imports directly
+        if len(name) - len(name.lstrip()) == 3:
+            packages[name.strip()] = int(cumulative_us)
+    return total, packages
+
+
+def construct_times(repo, config, first_use):
+    snippet = CONSTRUCT_SNIPPET.format(config=config, first_use=first_use)
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=repo, capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONWARNINGS": "ignore"})
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repo", default=".", help="Checkout to measure")
+    parser.add_argument("--module", default="Module.ocr_processor", help="Module whose import is timed")
+    parser.add_argument("--config", default="config.json", help="OCRProcessor config")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    runs = [import_times(args.repo, args.module) for _ in range(args.repeat)]
+    total_ms = statistics.median(total for total, _ in runs) / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms (median of {args.repeat})")
+    heaviest = sorted(runs[-1][1].items(), key=lambda item: -item[1])[:args.top]
+    for name, cumulative_us in heaviest:
+        print(f"  {name:<40s} {cumulative_us / 1000:8.1f} ms")
+
+    # ner.nlp forces the spaCy model load that lazy loading defers to the first NER call
+    for label, first_use in (("construct, no NER", "config"), ("construct + NER model", "ner.nlp")):
+        samples = [construct_times(args.repo, args.config, first_use) for _ in range(args.repeat)]
+        stage_ms = {stage: statistics.median(s[stage] for s in samples) * 1000 for stage in ("import", "construct", "first_use")}
+        print(f"{label:<22s} import {stage_ms['import']:7.1f} ms  construct {stage_ms['construct']:7.1f} ms  "
+              f"first use {stage_ms['first_use']:7.1f} ms  spaCy imported: {samples[-1]['spacy_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
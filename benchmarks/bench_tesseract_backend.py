@@ -0,0 +1,58 @@
+"""Compare per-card Tesseract latency of the available OCR backends.
+
+Run from the repository root:
+    python -m benchmarks.bench_tesseract_backend --limit 50
+"""
+import argparse
+import os
+import statistics
+import time
+
+from Module.ocr_processor import OCRProcessor
+from Module.tesseract_backend import BACKENDS
+
+
+def time_backend(backend, images, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            backend.image_to_data(image)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", default="output_images", help="Directory of card PNGs")
+    parser.add_argument("--limit", type=int, default=20, help="Number of cards to OCR")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the cards per backend")
+    args = parser.parse_args()
+
+    processor = OCRProcessor()
+    filenames = sorted(f for f in os.listdir(args.images) if f.endswith(".png"))[:args.limit]
+    # Preprocess once so only the recognition step is measured
+    images = [processor.preprocess_image(os.path.join(args.images, f)) for f in filenames]
+
+    results = {}
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class(processor.config["tesseract"])
+        except (ImportError, RuntimeError) as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        # Warm-up call so one-off model loading is not counted per card
+        backend.image_to_data(images[0])
+        latencies = time_backend(backend, images, args.repeat)
+        results[name] = latencies
+        print(f"{name}: mean {statistics.mean(latencies) * 1000:.1f} ms/card, "
+              f"p50 {statistics.median(latencies) * 1000:.1f} ms/card over {len(latencies)} cards")
+
+    if len(results) == 2:
+        baseline = statistics.mean(results["pytesseract"])
+        persistent = statistics.mean(results["tesserocr"])
+        print(f"tesserocr speedup: {baseline / persistent:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from Module.id_card import IdCard
+
+def build_training_data():
+    parser = argparse.ArgumentParser(description="Build Tesseract gt/box/lstmf training files, skipping up-to-date ones")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel tesseract jobs (default: CPU count)")
+    parser.add_argument("--stage", choices=["gt", "box", "lstmf", "all"], default="all")
+    args = parser.parse_args()
+    
+    builder = IdCard.training_data_builder(workers=args.workers)
+    if args.stage == "gt":
+        failures = builder.build_gt()
+    elif args.stage == "box":
+        failures = builder.build_boxes()
+    elif args.stage == "lstmf":
+        failures = builder.build_lstmf()
+    else:
+        failures = builder.build_all()
+    
+    if failures:
+        print(f"\n{len(failures)} jobs failed")
+
+if __name__ == "__main__":
+    build_training_data()
@@ -0,0 +1,43 @@
+import os
+import json
+import argparse
+from dotenv import load_dotenv
+from Module.evaluation import CardEvaluator
+from Module.scoring import SCORERS
+
+load_dotenv()
+
+INPUT_DIR = os.getenv("INPUT_DIR", "json_data")
+RESULTS_DIR = os.getenv("RESULTS_DIR", "ocr_results")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+
+def evaluate():
+    parser = argparse.ArgumentParser(description="Evaluate OCR + NER on held-out cards against their ground-truth JSON")
+    parser.add_argument("--images", help="Directory of card images named <user_id>.<ext>")
+    parser.add_argument("--json-dir", default=INPUT_DIR, help="Ground-truth JSON directory")
+    parser.add_argument("--render", action="store_true", help="Render the cards from --json-dir in memory instead of reading images")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS, help="Number of OCR worker processes")
+    parser.add_argument("--chunksize", type=int, default=16, help="Cards handed to a worker at a time")
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default="levenshtein", help="Field similarity metric")
+    parser.add_argument("--details", default=os.path.join(RESULTS_DIR, "evaluation_details.jsonl"), help="Per-card JSONL output")
+    parser.add_argument("--summary", default=os.path.join(RESULTS_DIR, "evaluation_summary.json"), help="Aggregate metrics output")
+    args = parser.parse_args()
+    if not args.images and not args.render:
+        parser.error("pass --images DIR or --render")
+
+    os.makedirs(os.path.dirname(args.details) or ".", exist_ok=True)
+    evaluator = CardEvaluator(args.json_dir, workers=args.workers, chunksize=args.chunksize, scorer=args.scorer)
+    summary = evaluator.evaluate(args.details, image_dir=args.images, render=args.render)
+    with open(args.summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\nEvaluated {summary['cards']} cards ({summary['throughput']:.2f} cards/sec)")
+    if summary["missing_truth"]:
+        print(f"Skipped {summary['missing_truth']} images without ground-truth JSON")
+    print(f"Precision: {summary['precision']:.2%}  Recall: {summary['recall']:.2%}  F1 Score: {summary['f1']:.2%}")
+    for field, metrics in summary["per_field_metrics"].items():
+        print(f"  {field:<12} F1 {metrics['f1']:.2%}  similarity {metrics['mean_similarity']:.2%}  support {metrics['support']}")
+    print(f"Details: {args.details}\nSummary: {args.summary}")
+
+if __name__ == "__main__":
+    evaluate()
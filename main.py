@@ -1,107 +1,305 @@
 import os
+import argparse
 from dotenv import load_dotenv
-from Module.id_card import IdCard
-from Module.ocr_processor import OCRProcessor
+from Module.id_card import IdCard, RenderFailure, init_render_worker
+from Module.batch_processor import BatchProcessor
+from Module.results_writer import ResultsWriter
+from Module.scoring import SCORERS, score_fields
+from Module.metrics import PipelineMetrics
+from Module.ingest_manifest import IngestManifest
+from Module.card_store import CardStore, CardStoreWriter, open_ground_truth, result_row
 import json
+import time
+from multiprocessing import Pool
 
 load_dotenv()
   
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output_images")
 INPUT_DIR = os.getenv("INPUT_DIR", "json_data")
 RESULTS_DIR = os.getenv("RESULTS_DIR", "ocr_results")
+LOGS_DIR = os.getenv("LOGS_DIR", "logs")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+SCORER = os.getenv("SCORER", "levenshtein")
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", ".ingest_manifest.sqlite")
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", 5.0))
+# Skip files modified within this many seconds; they may still be being copied in
+SETTLE_SECONDS = float(os.getenv("SETTLE_SECONDS", 1.0))
+# Columnar stores: ground truth indexed by user_id, and the validated results
+TRUTH_STORE_PATH = os.getenv("TRUTH_STORE_PATH", ".truth_store")
+RESULTS_STORE_PATH = os.getenv("RESULTS_STORE_PATH", os.path.join(RESULTS_DIR, "results_store"))
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-def normalize_text(text):
-    """Normalize text for comparison by fixing common OCR mistakes and case"""
-    if not text:
-        return ""
-    text = str(text).lower()
-    # Fix common OCR mistakes
-    text = text.replace('o', '0').replace('i', '1').replace('s', '5')
-    # Remove spaces and punctuation for comparison
-    text = ''.join(c for c in text if c.isalnum())
-    return text
+def validate_card(user_id, ocr_result, original_fields=None, scorer=SCORER):
+    """Compare OCR output for a card against its source JSON"""
+    # Load original JSON for comparison unless the caller already has it
+    if original_fields is None:
+        json_path = os.path.join(INPUT_DIR, f"{user_id}.json")
+        with open(json_path, 'r') as f:
+            original_fields = json.load(f)["extracted_fields"]
+    
+    # Compare and calculate accuracy
+    extracted_fields = ocr_result["extracted_fields"]
+    field_accuracy = score_fields(original_fields, extracted_fields, scorer)
+    
+    # Calculate overall accuracy
+    overall_accuracy = sum(field_accuracy.values()) / len(field_accuracy)
+    
+    return {
+        "user_id": user_id,
+        "confidence": ocr_result["confidence"],
+        "accuracy": overall_accuracy,
+        "field_accuracy": field_accuracy,
+        "extracted_fields": extracted_fields,
+        "original_fields": original_fields,
+        "raw_text": ocr_result["raw_text"]
+    }
 
-def process_and_validate_cards():
-    ocr_processor = OCRProcessor()
-    results = []
+def process_and_validate_cards(workers=OCR_WORKERS, chunksize=16, resume=False, in_memory=False, save_images=False, scorer=SCORER, profile=False, incremental=False, batch=None, shared_memory=False, session=None):
+    metrics = PipelineMetrics(LOGS_DIR, profile=profile)
+    with metrics.profile():
+        if session is not None:
+            summary = _run_cards(metrics, session, workers, chunksize, in_memory, save_images, scorer, batch, shared_memory)
+        else:
+            with RunSession(workers, resume=resume, incremental=incremental) as session:
+                summary = _run_cards(metrics, session, workers, chunksize, in_memory, save_images, scorer, batch, shared_memory)
     
-    # First create ID cards from JSON
-    for filename in os.listdir(INPUT_DIR):
-        if filename.endswith(".json"):
-            json_path = os.path.join(INPUT_DIR, filename)
-            IdCard.create_id_card(json_path)
+    # An incremental pass with nothing new to do leaves no metrics file behind
+    if metrics.counters["cards"] or metrics.counters["failures"] or not incremental:
+        report = metrics.finish()
+        metrics_path = metrics.write(report)
+        metrics.print_summary(report)
+        print(f"Metrics saved to {metrics_path}")
+    return summary
+
+def _list_files(directory, extension, exclude=()):
+    return [
+        os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.endswith(extension) and os.path.splitext(filename)[0] not in exclude
+    ]
+
+class RunSession:
+    def __init__(self, workers=OCR_WORKERS, resume=False, incremental=False, render_pool=False):
+        """Result writers, manifest and ground truth for one run, or kept open across a watch session
+
+        Results are streamed to disk one card at a time so a crash loses at most one card.
+        Incremental runs append, and the manifest holds the latest result of each card.
+        """
+        self.incremental = incremental
+        self.results_path = os.path.join(RESULTS_DIR, "ocr_results.jsonl")
+        self.writer = ResultsWriter(self.results_path, resume=resume or incremental)
+        self.store = CardStoreWriter(RESULTS_STORE_PATH, append=resume or incremental)
+        # Incremental runs only touch files that are new or changed since they were last recorded
+        self.manifest = IngestManifest(MANIFEST_PATH, settle_seconds=SETTLE_SECONDS) if incremental else None
+        self.render_pool = Pool(workers, initializer=init_render_worker) if render_pool and workers > 1 else None
+        self.truth = None
+        # Reader over the results store, refreshed after each pass's appends are flushed
+        self.results = None
+        self.summary = None
+
+    def close(self, terminate=False):
+        """Close writers and the manifest; terminate stops the render pool without waiting on busy workers"""
+        self.writer.close()
+        self.store.close()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.render_pool is not None:
+            if terminate:
+                self.render_pool.terminate()
+            else:
+                self.render_pool.close()
+            self.render_pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Leaving on an error or Ctrl+C must not wait for queued renders to finish
+        self.close(terminate=exc_type is not None)
+
+def _run_cards(metrics, session, workers, chunksize, in_memory, save_images, scorer, batch=None, shared_memory=False):
+    manifest = session.manifest
     
-    # Then process each generated image with OCR
-    for filename in os.listdir(OUTPUT_DIR):
-        if filename.endswith(".png"):
-            image_path = os.path.join(OUTPUT_DIR, filename)
-            user_id = os.path.splitext(filename)[0]
-            
-            # Process the image with OCR
-            ocr_result = ocr_processor.process_id_card(image_path)
-            
-            # Load original JSON for comparison
-            json_path = os.path.join(INPUT_DIR, f"{user_id}.json")
-            with open(json_path, 'r') as f:
-                original_data = json.load(f)
-            
-            # Compare and calculate accuracy
-            original_fields = original_data["extracted_fields"]
-            extracted_fields = ocr_result["extracted_fields"]
-            field_accuracy = {}
-            
-            for field in original_fields:
-                if field in extracted_fields:
-                    original_value = normalize_text(original_fields[field])
-                    extracted_value = normalize_text(extracted_fields[field])
-                    # Calculate similarity score
-                    if original_value and extracted_value:
-                        if len(original_value) > len(extracted_value):
-                            accuracy = sum(1 for i in range(len(extracted_value)) if i < len(original_value) and extracted_value[i] == original_value[i]) / len(original_value)
-                        else:
-                            accuracy = sum(1 for i in range(len(original_value)) if i < len(extracted_value) and original_value[i] == extracted_value[i]) / len(extracted_value)
-                    else:
-                        accuracy = 0.0
-                    field_accuracy[field] = accuracy
-                else:
-                    field_accuracy[field] = 0.0
-            
-            # Calculate overall accuracy
-            overall_accuracy = sum(field_accuracy.values()) / len(field_accuracy)
-            
-            # Store results
-            result = {
-                "user_id": user_id,
-                "confidence": ocr_result["confidence"],
-                "accuracy": overall_accuracy,
-                "field_accuracy": field_accuracy,
-                "extracted_fields": extracted_fields,
-                "original_fields": original_fields,
-                "raw_text": ocr_result["raw_text"]
-            }
-            results.append(result)
+    # First create ID cards from JSON, unless they are rendered in memory by the workers
+    json_changed = False
+    if not in_memory:
+        json_paths = _list_files(INPUT_DIR, ".json")
+        if manifest is not None:
+            json_paths = manifest.changed(json_paths)
+        rendered = []
+        if json_paths or manifest is None:
+            with metrics.timer("create_cards"):
+                rendered = IdCard.create_id_cards(json_paths, workers=workers, pool=session.render_pool)
+        for json_path, output_path in zip(json_paths, rendered):
+            if isinstance(output_path, RenderFailure):
+                # Recorded like a failed card, so the file is skipped until it changes
+                print(f"Failed to render {json_path}: {output_path.error}")
+                metrics.incr("errors")
+                metrics.incr("failures")
+                if manifest is not None:
+                    manifest.record(json_path, error=output_path.error)
+            elif manifest is not None:
+                manifest.record(json_path)
+        rendered = [path for path in rendered if not isinstance(path, RenderFailure)]
+        json_changed = bool(json_paths)
+    
+    completed = set() if manifest is not None else session.writer.completed
+    if completed:
+        print(f"Resuming: skipping {len(completed)} cards already in {session.results_path}")
     
-    # Save results
-    results_path = os.path.join(RESULTS_DIR, "ocr_results.json")
-    with open(results_path, 'w') as f:
-        json.dump({"results": results}, f, indent=2)
+    # Then process the cards with OCR across the worker pool.
+    # Sorting keeps the result order deterministic regardless of worker count.
+    batch = batch or BatchProcessor(workers=workers, chunksize=chunksize)
+    if in_memory:
+        json_paths = _list_files(INPUT_DIR, ".json", completed)
+        if manifest is not None:
+            json_paths = manifest.changed(json_paths, need_result=True)
+        # Results come back in input order, so they line up with json_paths
+        cards = (
+            (data["user_id"], ocr_result, data["extracted_fields"], json_path)
+            for json_path, (data, ocr_result) in zip(json_paths, batch.process_json(json_paths, save_images=save_images))
+        )
+    else:
+        image_paths = _list_files(OUTPUT_DIR, ".png", completed)
+        if manifest is not None:
+            # PNGs rendered above are complete; only files copied in from outside need to settle
+            image_paths = manifest.changed(image_paths, written=rendered)
+        # Ground truth comes from the indexed store instead of one JSON parse per card;
+        # it is only reopened when there are cards to check and the JSON changed
+        if image_paths and (session.truth is None or json_changed):
+            with metrics.timer("ground_truth"):
+                session.truth = open_ground_truth(INPUT_DIR, TRUTH_STORE_PATH)
+        # The shared-memory pipeline preprocesses and OCRs in separate tasks without pickling images
+        process = batch.process_shared if shared_memory else batch.process
+        cards = (
+            (os.path.splitext(os.path.basename(image_path))[0], ocr_result, None, image_path)
+            for image_path, ocr_result in process(image_paths)
+        )
     
-    print(f"OCR processing complete. Results saved to {results_path}")
-    return results
+    for user_id, ocr_result, original_fields, source_path in cards:
+        if "error" not in ocr_result:
+            with metrics.timer("validate"):
+                if original_fields is None:
+                    original_fields = session.truth.original_fields(user_id)
+                if original_fields is None:
+                    ocr_result["error"] = f"no ground truth for {user_id} in {INPUT_DIR}"
+                else:
+                    result = validate_card(user_id, ocr_result, original_fields, scorer)
+        metrics.record_card(ocr_result)
+        if "error" in ocr_result:
+            # Failed cards are left out of the results; the manifest keeps them from being retried until they change
+            print(f"Failed to process {source_path}: {ocr_result['error']}")
+            if manifest is not None:
+                manifest.record(source_path, error=ocr_result["error"])
+            continue
+        with metrics.timer("write"):
+            session.writer.write(result)
+            session.store.append(result_row(result))
+        if manifest is not None:
+            manifest.record(source_path, result)
+    
+    # A watch poll that found nothing new reuses the last summary instead of rescanning
+    if batch.processed or session.summary is None:
+        if batch.processed or manifest is None:
+            print(f"OCR throughput: {batch.throughput:.2f} cards/sec ({batch.processed} cards, {batch.workers} workers)")
+        session.store.flush()
+        if manifest is not None:
+            manifest.commit()
+            summary = manifest.summary()
+        else:
+            summary = session.writer.summary()
+        # Per-field accuracy is a scan over the store's memory-mapped columns
+        if session.results is None:
+            session.results = CardStore(RESULTS_STORE_PATH)
+        else:
+            session.results.refresh()
+        summary["field_accuracy"] = session.results.summary()["field_accuracy"]
+        session.summary = summary
+        if batch.processed or manifest is None:
+            print(f"OCR processing complete. Results saved to {session.results_path}")
+    return session.summary
+
+def watch(interval=WATCH_INTERVAL, workers=OCR_WORKERS, chunksize=16, in_memory=False, save_images=False, scorer=SCORER, shared_memory=False):
+    """Poll INPUT_DIR and OUTPUT_DIR and process new or changed cards as they arrive"""
+    print(f"Watching {INPUT_DIR} and {OUTPUT_DIR} every {interval}s (Ctrl+C to stop)")
+    summary = None
+    # One worker pool (and image ring), one set of writers and one render pool for the whole session,
+    # so a poll that finds nothing new costs a directory scan and little else.
+    # Ctrl+C is caught outside the sessions, so they see it and stop their workers instead of joining them.
+    try:
+        with BatchProcessor(workers=workers, chunksize=chunksize, shared_memory=shared_memory) as batch, \
+                RunSession(workers, incremental=True, render_pool=not in_memory) as session:
+            while True:
+                try:
+                    summary = process_and_validate_cards(
+                        workers=workers,
+                        chunksize=chunksize,
+                        in_memory=in_memory,
+                        save_images=save_images,
+                        scorer=scorer,
+                        incremental=True,
+                        batch=batch,
+                        shared_memory=shared_memory,
+                        session=session
+                    )
+                except Exception as e:
+                    # Cards recorded before the error are kept; the rest are picked up by the next poll
+                    print(f"Watch poll failed: {type(e).__name__}: {e}")
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    return summary
 
 if __name__ == '__main__':
-    # Generate ID cards and process with OCR
-    results = process_and_validate_cards()
+    parser = argparse.ArgumentParser(description="Generate ID cards and validate OCR output")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS, help="Number of OCR worker processes")
+    parser.add_argument("--chunksize", type=int, default=16, help="Cards handed to a worker at a time, also the NER batch size")
+    parser.add_argument("--resume", action="store_true", help="Skip cards already present in the results file")
+    parser.add_argument("--in-memory", action="store_true", help="Render cards straight into OCR without writing PNGs")
+    parser.add_argument("--save-images", action="store_true", help="With --in-memory, still write the rendered PNGs")
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default=SCORER, help="Field similarity metric used for accuracy")
+    parser.add_argument("--shared-memory", action="store_true", help="Preprocess PNGs into a shared-memory ring and OCR them from there (see the shared_memory config)")
+    parser.add_argument("--profile", action="store_true", help="cProfile the run (OCR itself is only captured with --workers 1)")
+    parser.add_argument("--incremental", action="store_true", help="Only process JSON and PNG files that are new or changed since the last run")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process new or changed cards as they arrive (implies --incremental)")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between directory scans in --watch mode")
+    args = parser.parse_args()
+    if args.shared_memory and args.in_memory:
+        parser.error("--shared-memory preprocesses PNG files and cannot be combined with --in-memory")
+    if args.shared_memory and not BatchProcessor().shared_memory_supported():
+        parser.error("--shared-memory does not support layout extraction or the OCR cascade; disable them in config.json")
     
-    # Calculate and display overall statistics
-    total_cards = len(results)
-    avg_confidence = sum(r["confidence"] for r in results) / total_cards
-    avg_accuracy = sum(r["accuracy"] for r in results) / total_cards
+    if args.watch:
+        summary = watch(
+            interval=args.interval,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            in_memory=args.in_memory,
+            save_images=args.save_images,
+            scorer=args.scorer,
+            shared_memory=args.shared_memory
+        )
+        if summary is None:
+            raise SystemExit(0)
+    else:
+        # Generate ID cards and process with OCR
+        summary = process_and_validate_cards(
+            workers=args.workers,
+            chunksize=args.chunksize,
+            resume=args.resume,
+            in_memory=args.in_memory,
+            save_images=args.save_images,
+            scorer=args.scorer,
+            profile=args.profile,
+            incremental=args.incremental,
+            shared_memory=args.shared_memory
+        )
     
     print(f"\nProcessing Summary:")
-    print(f"Total cards processed: {total_cards}")
-    print(f"Average OCR confidence: {avg_confidence:.2f}%")
-    print(f"Average field accuracy: {avg_accuracy:.2%}")
\ No newline at end of file
+    print(f"Total cards processed: {summary['total_cards']}")
+    print(f"Average OCR confidence: {summary['avg_confidence']:.2f}%")
+    print(f"Average field accuracy: {summary['avg_accuracy']:.2%}")
+    for field, accuracy in summary["field_accuracy"].items():
+        print(f"  {field:<12} {accuracy:.2%}")
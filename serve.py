@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+from Module.ocr_service import OCRService
+
+def serve():
+    parser = argparse.ArgumentParser(description="Serve ID card OCR over HTTP: POST image bytes to /ocr, latency stats at /metrics")
+    parser.add_argument("--config", default="config.json", help="Config file; the service section holds the defaults below")
+    parser.add_argument("--host", default=None, help="TCP host to bind")
+    parser.add_argument("--port", type=int, default=None, help="TCP port to bind")
+    parser.add_argument("--unix-socket", default=None, help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="OCR worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Maximum cards per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=None, help="How long a batch waits to fill up")
+    parser.add_argument("--queue-size", type=int, default=None, help="Queued requests before answering 503")
+    args = parser.parse_args()
+    
+    service = OCRService(
+        args.config,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_wait_ms=args.max_wait_ms,
+        queue_size=args.queue_size
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("\nOCR service stopped")
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,116 @@
+import numpy as np
+
+from Module.card_store import (MISSING, TRUTH_TEXT_COLUMNS, CardStore, CardStoreWriter,
+                               open_ground_truth, result_row)
+
+
+def make_result(user_id, accuracy=1.0, **extra_fields):
+    return {
+        "user_id": user_id,
+        "confidence": 90.0,
+        "accuracy": accuracy,
+        "original_fields": {"name": "JOHN DOE", "branch": "", **extra_fields},
+        "extracted_fields": {"name": "JOHN DOE"},
+        "field_accuracy": {"name": accuracy, **{field: 0.0 for field in extra_fields}}
+    }
+
+
+def test_round_trip(tmp_path):
+    result = make_result("stu_001", email="john@example.com")
+    with CardStoreWriter(str(tmp_path)) as writer:
+        writer.append(result_row(result))
+
+    store = CardStore(str(tmp_path))
+    assert len(store) == 1
+    # Fields outside CARD_FIELDS come back from the JSON column, "" stays distinct from unset
+    assert store.result("stu_001") == result
+    assert store.text("original_college", 0) is MISSING
+    assert np.isnan(store.floats("accuracy_college")[0])
+    assert store.result("stu_404") is None
+
+
+def test_latest_record_wins(tmp_path):
+    with CardStoreWriter(str(tmp_path)) as writer:
+        writer.append(result_row(make_result("stu_001", accuracy=0.0)))
+        writer.append(result_row(make_result("stu_002", accuracy=1.0)))
+    with CardStoreWriter(str(tmp_path), append=True) as writer:
+        writer.append(result_row(make_result("stu_001", accuracy=0.5, email="a@b.co")))
+
+    store = CardStore(str(tmp_path))
+    assert len(store) == 3
+    assert store.row("stu_001") == 2
+    assert store.latest_rows().tolist() == [1, 2]
+    summary = store.summary()
+    assert summary["total_cards"] == 2
+    assert summary["avg_accuracy"] == 0.75
+    # Columns no card set are left out; extra fields are folded in
+    assert summary["field_accuracy"] == {"name": 0.75, "email": 0.0}
+
+
+def test_refresh_sees_flushed_rows(tmp_path):
+    writer = CardStoreWriter(str(tmp_path))
+    writer.append(result_row(make_result("stu_001")))
+    writer.flush()
+    store = CardStore(str(tmp_path))
+
+    writer.append(result_row(make_result("stu_002")))
+    assert "stu_002" not in store
+    writer.flush()
+    assert store.refresh()
+    assert "stu_002" in store
+    assert not store.refresh()
+    writer.close()
+
+
+def test_index_merged_across_flushes(tmp_path):
+    user_ids = [f"stu_{i % 7:03d}" for i in range(60)]
+    writer = CardStoreWriter(str(tmp_path), TRUTH_TEXT_COLUMNS, [])
+    for i, user_id in enumerate(user_ids[:40]):
+        writer.append({"user_id": user_id, "original_name": str(i)})
+        if i % 9 == 0:
+            writer.flush()
+    # Rows published by flush but not closed, as after a crash, are kept
+    writer.flush()
+    with CardStoreWriter(str(tmp_path), TRUTH_TEXT_COLUMNS, [], append=True) as writer:
+        for i, user_id in enumerate(user_ids[40:], 40):
+            writer.append({"user_id": user_id, "original_name": str(i)})
+
+    store = CardStore(str(tmp_path))
+    hashes = np.fromfile(str(tmp_path / "user_id.hash"), dtype=np.uint64)
+    assert store._index_rows.tolist() == np.argsort(hashes, kind="stable").tolist()
+    latest = {user_id: i for i, user_id in enumerate(user_ids)}
+    for user_id, i in latest.items():
+        assert store.text("original_name", store.row(user_id)) == str(i)
+
+
+def test_append_drops_unpublished_rows(tmp_path):
+    writer = CardStoreWriter(str(tmp_path), TRUTH_TEXT_COLUMNS, [])
+    writer.append({"user_id": "stu_001", "original_name": "A"})
+    writer.flush()
+    # Written to the column files but never published by a flush
+    writer.append({"user_id": "stu_002", "original_name": "B"})
+    for f in writer._files.values():
+        f.flush()
+
+    with CardStoreWriter(str(tmp_path), TRUTH_TEXT_COLUMNS, [], append=True) as appender:
+        appender.append({"user_id": "stu_003", "original_name": "C"})
+
+    store = CardStore(str(tmp_path))
+    assert len(store) == 2
+    assert "stu_002" not in store
+    assert store.original_fields("stu_003") == {"name": "C"}
+
+
+def test_ground_truth_rebuilt_on_change(tmp_path):
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    (json_dir / "stu_001.json").write_text('{"user_id": "stu_001", "extracted_fields": {"name": "A"}}')
+    (json_dir / "stu_002.json").write_text("{not json")
+    store_path = str(tmp_path / "truth")
+
+    store = open_ground_truth(str(json_dir), store_path)
+    assert store.original_fields("stu_001") == {"name": "A"}
+    assert store.original_fields("stu_002") is None
+
+    (json_dir / "stu_002.json").write_text('{"user_id": "stu_002", "extracted_fields": {"name": "B"}}')
+    assert open_ground_truth(str(json_dir), store_path).original_fields("stu_002") == {"name": "B"}
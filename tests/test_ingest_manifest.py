@@ -0,0 +1,63 @@
+import os
+
+from Module.ingest_manifest import IngestManifest
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_changed_until_recorded(tmp_path):
+    card = write(tmp_path / "stu_001.json", "{}")
+    with IngestManifest(str(tmp_path / "manifest.sqlite")) as manifest:
+        assert manifest.changed([card]) == [card]
+        manifest.record(card)
+        assert manifest.changed([card]) == []
+        # Recorded without a result, e.g. only rendered to PNG
+        assert manifest.changed([card], need_result=True) == [card]
+
+        manifest.record(card, result={"user_id": "stu_001", "confidence": 90.0, "accuracy": 1.0})
+        assert manifest.changed([card], need_result=True) == []
+        assert manifest.result(card)["accuracy"] == 1.0
+
+
+def test_failure_skipped_until_file_changes(tmp_path):
+    card = write(tmp_path / "stu_001.json", "{not json")
+    with IngestManifest(str(tmp_path / "manifest.sqlite")) as manifest:
+        manifest.record(card, error="JSONDecodeError: Expecting property name")
+        assert manifest.changed([card], need_result=True) == []
+        assert manifest.result(card) is None
+        # Failures are not cards in the summary
+        assert manifest.summary()["total_cards"] == 0
+
+        write(tmp_path / "stu_001.json", '{"user_id": "stu_001"}')
+        assert manifest.changed([card], need_result=True) == [card]
+
+
+def test_touched_file_with_same_content_unchanged(tmp_path):
+    card = write(tmp_path / "stu_001.json", "{}")
+    with IngestManifest(str(tmp_path / "manifest.sqlite")) as manifest:
+        manifest.record(card)
+        stat = os.stat(card)
+        os.utime(card, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manifest.changed([card]) == []
+
+        write(tmp_path / "stu_001.json", "[]")
+        assert manifest.changed([card]) == [card]
+
+
+def test_settle_skips_fresh_files_unless_written(tmp_path):
+    card = write(tmp_path / "stu_001.json", "{}")
+    with IngestManifest(str(tmp_path / "manifest.sqlite"), settle_seconds=60) as manifest:
+        assert manifest.changed([card]) == []
+        assert manifest.changed([card], written=[card]) == [card]
+
+
+def test_failures_persist_across_runs(tmp_path):
+    card = write(tmp_path / "stu_001.json", "{not json")
+    path = str(tmp_path / "manifest.sqlite")
+    with IngestManifest(path) as manifest:
+        manifest.record(card, error="JSONDecodeError")
+    with IngestManifest(path) as manifest:
+        assert manifest.changed([card], need_result=True) == []
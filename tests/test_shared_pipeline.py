@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import zlib
+
+import pytest
+
+from Module.batch_processor import BatchProcessor
+from Module.id_card import IdCard
+from Module.tesseract_backend import PytesseractBackend
+
+REPO_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+def fake_image_to_data(self, image):
+    """image_to_data stand-in whose roll number is a checksum of the preprocessed image"""
+    words = ["Roll", "number:", f"AB{zlib.crc32(image.tobytes()) % 10**8:08d}"]
+    return {
+        "level": [5] * 3, "page_num": [1] * 3, "block_num": [1] * 3, "par_num": [1] * 3,
+        "line_num": [1] * 3, "word_num": [1, 2, 3], "left": [0, 50, 120], "top": [10] * 3,
+        "width": [45, 65, 90], "height": [20] * 3, "conf": [95] * 3, "text": words
+    }
+
+
+@pytest.fixture
+def cards(tmp_path, monkeypatch):
+    """Config and card images for a Tesseract-free run; forked workers inherit the fake"""
+    monkeypatch.setattr(PytesseractBackend, "image_to_data", fake_image_to_data)
+    monkeypatch.setattr(PytesseractBackend, "version", "fake")
+
+    with open(REPO_CONFIG, 'r') as f:
+        config = json.load(f)
+    config["cache"]["enabled"] = False
+    config["extraction"]["use_ner"] = False
+    config["preprocessing"].update(resize_width=600, denoise=False)
+    config["shared_memory"] = {"slot_mb": 1}
+    config_path = str(tmp_path / "config.json")
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+    image_paths = []
+    for i in range(7):
+        image_path = str(tmp_path / f"stu_{i:03d}.png")
+        IdCard.render_id_card({
+            "user_id": f"stu_{i:03d}",
+            "extracted_fields": {"name": "John Doe", "college": "JNTU", "roll_number": f"22JNT{i:04d}",
+                                 "branch": "Civil", "valid_upto": "2028"}
+        }).save(image_path)
+        image_paths.append(image_path)
+    # An unreadable card in the middle comes back as an error result in its place
+    broken = str(tmp_path / "broken.png")
+    with open(broken, 'w') as f:
+        f.write("not an image")
+    image_paths.insert(3, broken)
+    return config_path, image_paths
+
+
+def comparable(results):
+    return [(path, {key: value for key, value in result.items() if key != "timings"}) for path, result in results]
+
+
+@pytest.mark.parametrize("workers", [
+    1,
+    pytest.param(2, marks=pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                             reason="workers need the fake backend from a forked parent"))
+])
+def test_shared_matches_process(cards, workers):
+    config_path, image_paths = cards
+    expected = comparable(BatchProcessor(1, config_path, chunksize=3).process(image_paths))
+    assert "error" in expected[3][1]
+    assert len({result["extracted_fields"]["roll_number"] for _, result in expected[:3] + expected[4:]}) == 7
+
+    assert comparable(BatchProcessor(workers, config_path, chunksize=3).process_shared(image_paths)) == expected
+
+    with BatchProcessor(workers, config_path, chunksize=3, shared_memory=True) as batch:
+        # A long-lived ring gets every slot back, also after a caller stops early
+        assert comparable(batch.process_shared(image_paths)) == expected
+        assert batch._ring.free == batch._ring.slots
+        results = batch.process_shared(image_paths)
+        next(results)
+        results.close()
+        assert batch._ring.free == batch._ring.slots
+        assert comparable(batch.process_shared(image_paths)) == expected
@@ -1,13 +1,23 @@
 import os
+import argparse
 from Module.ner_processor import NERProcessor
 
 def train_ner_model():
+    parser = argparse.ArgumentParser(description="Train the card NER model on json_data")
+    parser.add_argument("--iterations", type=int, default=50, help="Maximum training epochs")
+    parser.add_argument("--patience", type=int, default=5, help="Stop after this many epochs without a dev F1 improvement")
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild training docs from JSON instead of the .spacy cache")
+    args = parser.parse_args()
+    
     # Initialize NER processor
     ner = NERProcessor()
     
-    # Prepare training data
+    # Prepare training data, converted once and cached as a DocBin
     print("Preparing training data...")
-    training_data = ner.prepare_training_data("json_data")
+    if args.no_cache:
+        training_data = ner.prepare_training_data("json_data")
+    else:
+        training_data = ner.training_docs("json_data")
     print(f"Prepared {len(training_data)} training examples")
     
     # Create output directory
@@ -15,10 +25,10 @@ def train_ner_model():
     
     # Train model
     print("Training NER model...")
-    test_data = ner.train_model(training_data, "trained_models/ner", n_iter=50)
+    test_data = ner.train_model(training_data, "trained_models/ner", n_iter=args.iterations, patience=args.patience)
     
-    # Evaluate model
-    print("\nEvaluating model...")
+    # Evaluate on the test split, which early stopping never saw
+    print(f"\nEvaluating model on {len(test_data)} held-out test examples...")
     results = ner.evaluate_model(test_data)
     
     # Print results